@@ -0,0 +1,75 @@
+import copy
+import time
+
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+import api.constants as const
+from api.cache import TTLCache, bump_cache_version, cache_version_key
+
+token_cache = TTLCache(const.TOKEN_CACHE_SIZE, const.TOKEN_CACHE_TTL)
+
+
+def token_namespace(key):
+    return f'auth:{key}'
+
+
+def token_version(key):
+    """Версия токена в общем кеше без создания ее для чужих ключей."""
+    return cache.get(cache_version_key(token_namespace(key)))
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+    bump_cache_version(token_namespace(key))
+
+
+def invalidate_user_tokens(user_id):
+    token_cache.delete_where(lambda item: item[0].pk == user_id)
+    for key in Token.objects.filter(user_id=user_id).values_list(
+        'key', flat=True
+    ):
+        bump_cache_version(token_namespace(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кешем token -> user в памяти процесса.
+
+    Запись хранит версию пространства кеша auth:<токен>, которую
+    сигналы увеличивают при удалении токена и при сохранении его
+    пользователя. Версия сверяется с общим кешем при каждом обращении,
+    поэтому выход, блокировка и деактивация действуют во всех процессах
+    сразу. Неактивные и заблокированные пользователи не проходят
+    аутентификацию.
+    """
+
+    def load(self, key):
+        """Пользователь и токен из базы и версия, при которой они прочитаны.
+
+        Версия создается только для существующего токена. Если ее успели
+        увеличить после чтения из базы, запись не кешируется.
+        """
+        version = token_version(key)
+        user, token = super().authenticate_credentials(key)
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(
+                cache_version_key(token_namespace(key)), version, timeout=None
+            ):
+                return user, token, None
+        return user, token, version
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None or cached[2] != token_version(key):
+            cached = self.load(key)
+            if cached[2] is not None:
+                token_cache.set(key, cached)
+        user, token, _ = cached
+        if not user.is_active:
+            raise AuthenticationFailed(const.USER_IS_INACTIVE)
+        if user.is_blocked:
+            raise AuthenticationFailed(const.USER_IS_BLOCKED)
+        return copy.copy(user), token
@@ -0,0 +1,168 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+import api.constants as const
+
+
+class TTLCache:
+    """Ограниченный по размеру кеш процесса с вытеснением LRU и TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [
+                key for key, (value, _) in self._data.items()
+                if predicate(value)
+            ]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def cache_version_key(namespace):
+    return f'api:{namespace}:version'
+
+
+def get_cache_version(namespace):
+    """Версия пространства кеша: время ее последнего увеличения в нс.
+
+    Версия, вытесненная из кеша, создается заново текущим временем,
+    поэтому не совпадает ни с одной из выданных ранее.
+    """
+    key = cache_version_key(namespace)
+    version = time.time_ns()
+    cache.add(key, version, timeout=None)
+    return cache.get(key, version)
+
+
+def get_cache_versions(namespaces):
+    """Версии нескольких пространств кеша одним обращением к кешу."""
+    keys = {
+        cache_version_key(namespace): namespace for namespace in namespaces
+    }
+    versions = {
+        keys[key]: version for key, version in cache.get_many(keys).items()
+    }
+    for namespace in set(namespaces) - versions.keys():
+        versions[namespace] = get_cache_version(namespace)
+    return versions
+
+
+def bump_cache_version(namespace):
+    """Делает недействительными все закешированные ответы пространства."""
+    cache.set(cache_version_key(namespace), time.time_ns(), timeout=None)
+
+
+class VersionedLocalValue:
+    """Значение в памяти процесса, следующее за версией пространства кеша.
+
+    Значение строится лениво и перестраивается, как только версия
+    пространства namespace в общем кеше отличается от той, при которой
+    оно построено. Версию увеличивают сигналы и команды импорта в любом
+    процессе, поэтому значение устаревает во всех воркерах сразу.
+    """
+
+    namespace = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._value = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._value = None
+
+    def get(self):
+        version = get_cache_version(self.namespace)
+        with self._lock:
+            if self._value is None or self._version != version:
+                self._value = self.build()
+                self._version = version
+            return self._value
+
+
+class VersionedCacheMixin:
+    """Кеширует ответы list и retrieve справочных вьюсетов.
+
+    Ключ содержит номер версии пространства cache_namespace, который
+    увеличивается сигналами при изменении данных, и нормализованные
+    параметры запроса.
+    """
+
+    cache_namespace = None
+
+    def normalize_query_params(self, query_params):
+        return sorted(
+            (key, sorted(values)) for key, values in query_params.lists()
+        )
+
+    def get_cache_key(self, request):
+        query = repr((
+            request.get_host(),
+            self.action,
+            self.kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+            self.normalize_query_params(request.query_params),
+        ))
+        return 'api:{}:{}:{}'.format(
+            self.cache_namespace,
+            get_cache_version(self.cache_namespace),
+            hashlib.md5(query.encode()).hexdigest(),
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, const.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -16,6 +16,54 @@ INGREDIENT_MIN_VALUE = 1
 INGREDIENT_MAX_VALUE = 10000
 COOKING_TIME_MIN = 1
 COOKING_TIME_MAX = 7000
+RECIPES_LIMIT_MAX = 50
+INGREDIENT_SEARCH_LIMIT = 100
+SEARCH_CONFIG = 'russian'
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+# Пространства кеша, от которых зависит представление рецепта.
+RECIPE_CACHE_NAMESPACES = ('recipes', 'tags', 'ingredients', 'users')
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 10000
+MEMBERSHIP_CACHE_TTL = 300
+MEMBERSHIP_CACHE_USERS = 5000
+MEMBERSHIP_MAX_ITEMS = 2000
+BULK_RECIPES_MAX = 100
+BULK_ADDED = 'added'
+BULK_ALREADY_ADDED = 'already_added'
+BULK_REMOVED = 'removed'
+BULK_NOT_ADDED = 'not_added'
+BULK_NOT_FOUND = 'not_found'
+FIELDS_QUERY_PARAM = 'fields'
+OMIT_QUERY_PARAM = 'omit'
+SNAPSHOT_HASH_LENGTH = 16
+SNAPSHOT_MAX_AGE = 60 * 60 * 24 * 365
+SNAPSHOT_GZIP_LEVEL = 9
+SNAPSHOT_BROTLI_QUALITY = 11
+METRICS_FLUSH_INTERVAL = 5
+METRICS_PHASES = ('db', 'serialize', 'render')
+METRICS_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+METRICS_BUCKETS = {
+    'foodgram_request_duration_seconds': METRICS_DURATION_BUCKETS,
+    'foodgram_db_duration_seconds': METRICS_DURATION_BUCKETS,
+    'foodgram_db_queries': (0, 1, 2, 5, 10, 20, 50, 100),
+    'foodgram_serialize_duration_seconds': METRICS_DURATION_BUCKETS,
+    'foodgram_render_duration_seconds': METRICS_DURATION_BUCKETS,
+}
+METRICS_HELP = {
+    'foodgram_request_duration_seconds': 'Время обработки запроса.',
+    'foodgram_db_duration_seconds': 'Время SQL-запросов за запрос.',
+    'foodgram_db_queries': 'Число SQL-запросов за запрос.',
+    'foodgram_serialize_duration_seconds': 'Время сериализации ответа.',
+    'foodgram_render_duration_seconds': 'Время рендеринга ответа.',
+}
+SLOW_REQUEST_MAX_STATEMENTS = 1000
+METRICS_TOKEN_ERROR = 'Неверный токен доступа к метрикам.'
+METRICS_ACCESS_ERROR = 'Метрики доступны только администраторам.'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
 
 USER_TEMPLATE = '{} {}'
 SUBSCRIBE_TEMPLATE = 'Пользователь {} подписан на автора {}.'
@@ -25,6 +73,7 @@ SUBSCRIBE_NOT_EXIST = 'Вы не подписаны на автора {}.'
 UNSUBSCRIBE_SUCCESS = 'Вы отписались от автора {}.'
 PASSWORD_CHANGE_SUCCESS = 'Пароль успешно изменен.'
 USER_IS_BLOCKED = 'Пользователь заблокирован.'
+USER_IS_INACTIVE = 'Пользователь неактивен или удален.'
 SYMBOLS_WRONG = 'Использовать символ(ы): {} в составе логина запрещено!'
 
 COLOR_SYMBOLS_ERROR = 'Не верный формат кода цвета в шестнадцатеричном виде.'
@@ -40,7 +89,8 @@ INGREDIENT_IN_RECIPE_TEMPLATE = 'Ингредиент {} в количестве
 FAVORITE_TEMPLATE = 'Рецепт {} в избранном пользователя {}.'
 SHOPING_CART_TEMPLATE = 'Список покупок пользователя {}.'
 SHOPING_CART = 'Ингредиент {} в количестве {} {}.'
-SHOPING_CART_FILE_NAME = 'shopping_cart.txt'
+SHOPING_CART_FILE_NAME = 'shopping_cart.{}'
+SHOPING_CART_CHUNK_SIZE = 2000
 
 RECIPE_ALREADY_EXIST = 'Рецепт ранее уже был добавлен.'
 RECIPE_NOT_EXIST = 'Рецепта не существует.'
@@ -51,7 +101,35 @@ TAG_NULL_ERROR = 'У рецепта должен быть хотя бы один
 INGREDIENT_UNIQUE_ERROR = 'Ингредиенты одного рецепта должны быть уникальные.'
 TAG_UNIQUE_ERROR = 'Теги одного рецепта должны быть уникальные.'
 
+RECIPES_LIMIT_ERROR = (
+    'Параметр recipes_limit должен быть целым числом от 0 до {}.'
+)
+
+OBJECTS_NOT_EXIST_ERROR = 'Объекты с id {} не существуют.'
+OBJECT_ID_ERROR = 'Некорректный id: {}.'
+SEARCH_CURSOR_ERROR = (
+    'Поиск сортирует рецепты по релевантности и не поддерживает '
+    'пагинацию курсором.'
+)
+
 FIELD_IS_NONE_ERROR = 'Значение не может быть пустым.'
 FIELD_IS_REQUREST = 'Обязательное поле.'
 
 PULL_SUCCSESS = 'Данные для таблицы :{}, ЗАГРУЖЕНЫ!'
+PULL_PROGRESS = '{}: обработано строк: {}.'
+PULL_FORMAT_ERROR = 'Неизвестный формат файла: {}.'
+PULL_COLUMNS_ERROR = 'В файле {} нет обязательных колонок: {}.'
+IMPORT_BATCH_SIZE = 5000
+
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_MAX_SIDE = 2048
+IMAGE_JPEG_QUALITY = 85
+IMAGE_SIZE_ERROR = 'Размер изображения не может превышать {} МБ.'
+IMAGE_PIXELS_ERROR = 'Изображение не может содержать больше {} пикселей.'
+IMAGE_INVALID_ERROR = 'Загрузите корректное изображение.'
+
+SNAPSHOT_NOT_FOUND = (
+    'Снимок каталога {} не найден: запросите актуальный хеш '
+    'в /api/ingredients/snapshot/.'
+)
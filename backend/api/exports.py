@@ -0,0 +1,68 @@
+import csv
+import json
+
+from django.db.models import F
+
+import api.constants as const
+from recipes.models import ShoppingCartTotal
+
+
+class Echo:
+    """Псевдобуфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def shopping_cart_rows(user):
+    """Суммарное количество каждого ингредиента в списке покупок."""
+    return (
+        ShoppingCartTotal.objects.filter(user=user)
+        .values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            total_summ=F('total_amount'),
+        )
+        .order_by('ingredient__name')
+        .iterator(chunk_size=const.SHOPING_CART_CHUNK_SIZE)
+    )
+
+
+def export_txt(user, rows):
+    yield const.SHOPING_CART_TEMPLATE.format(user)
+    for row in rows:
+        yield '\n' + const.SHOPING_CART.format(
+            row['ingredient__name'],
+            row['total_summ'],
+            row['ingredient__measurement_unit']
+        )
+
+
+def export_csv(user, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for row in rows:
+        yield writer.writerow((
+            row['ingredient__name'],
+            row['total_summ'],
+            row['ingredient__measurement_unit']
+        ))
+
+
+def export_json(user, rows):
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps({
+            'name': row['ingredient__name'],
+            'amount': row['total_summ'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'json': export_json,
+}
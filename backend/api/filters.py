@@ -1,5 +1,12 @@
+from django import forms
+from django.db.models import Count, Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
 
+import api.constants as const
+from api.memberships import favorites, shopping_carts
+from api.pagination import CustomPagination
+from api.search import tag_map
 from recipes.models import Ingredient, Recipe
 
 
@@ -12,7 +19,17 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.Filter(
+        method='filter_tags', widget=forms.SelectMultiple
+    )
+    tags_match = filters.ChoiceFilter(
+        choices=(
+            (const.TAGS_MATCH_ANY, const.TAGS_MATCH_ANY),
+            (const.TAGS_MATCH_ALL, const.TAGS_MATCH_ALL),
+        ),
+        method='filter_tags_match'
+    )
+    search = filters.CharFilter(method='filter_search')
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
@@ -20,14 +37,52 @@ class RecipeFilter(FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'tags_match', 'is_favorited',
+            'is_in_shopping_cart', 'search'
+        )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        match_all = (
+            self.form.cleaned_data.get('tags_match') == const.TAGS_MATCH_ALL
+        )
+        tag_ids, all_found = tag_map.resolve(value)
+        if not tag_ids or (match_all and not all_found):
+            return queryset.none()
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+        )
+        if match_all and len(tag_ids) > 1:
+            recipe_tags = recipe_tags.values('recipe_id').annotate(
+                tags_count=Count('tag_id')
+            ).filter(tags_count=len(tag_ids))
+        return queryset.filter(Exists(recipe_tags))
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        if CustomPagination.is_keyset(self.request):
+            raise ValidationError({name: const.SEARCH_CURSOR_ERROR})
+        return queryset.search(value)
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
+            ids = favorites.get(self.request.user)
+            if ids is not None:
+                return queryset.filter(pk__in=ids)
             return queryset.filter(favorite__user=self.request.user)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
+            ids = shopping_carts.get(self.request.user)
+            if ids is not None:
+                return queryset.filter(pk__in=ids)
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
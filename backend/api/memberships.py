@@ -0,0 +1,64 @@
+import api.constants as const
+from api.cache import TTLCache, bump_cache_version, get_cache_version
+from recipes.models import Favorite, ShoppingCart
+
+TOO_MANY = object()
+
+
+class RecipeMembership:
+    """Множества id рецептов пользователя в избранном или списке покупок.
+
+    Множество загружается одним запросом при первом обращении и хранится
+    вместе с версией пространства кеша <модель>:<id пользователя>.
+    Сигналы моделей и массовые операции вызывают touch(), который
+    увеличивает версию в общем кеше, поэтому изменения из любого
+    процесса, админки или shell перезагружают множество во всех
+    воркерах. Хранятся только множества не длиннее MEMBERSHIP_MAX_ITEMS
+    для MEMBERSHIP_CACHE_USERS пользователей; для остальных get()
+    возвращает None, и вызывающий код обращается к БД.
+    """
+
+    def __init__(self, model, maxsize=const.MEMBERSHIP_CACHE_USERS,
+                 ttl=const.MEMBERSHIP_CACHE_TTL,
+                 max_items=const.MEMBERSHIP_MAX_ITEMS):
+        self.model = model
+        self.max_items = max_items
+        self._cache = TTLCache(maxsize, ttl)
+
+    def namespace(self, user_id):
+        return f'{self.model._meta.model_name}:{user_id}'
+
+    def load(self, user_id, limit=None):
+        return set(
+            self.model.objects.filter(user_id=user_id)
+            .values_list('recipe_id', flat=True)[:limit]
+        )
+
+    def clear(self):
+        self._cache.clear()
+
+    def get(self, user):
+        if not user.is_authenticated:
+            return set()
+        version = get_cache_version(self.namespace(user.pk))
+        cached = self._cache.get(user.pk)
+        if cached is None or cached[0] != version:
+            ids = self.load(user.pk, self.max_items + 1)
+            if len(ids) > self.max_items:
+                ids = TOO_MANY
+            cached = (version, ids)
+            self._cache.set(user.pk, cached)
+        return None if cached[1] is TOO_MANY else cached[1]
+
+    def touch(self, user_id):
+        """Делает множество пользователя устаревшим во всех процессах."""
+        self._cache.delete(user_id)
+        bump_cache_version(self.namespace(user_id))
+
+
+favorites = RecipeMembership(Favorite)
+shopping_carts = RecipeMembership(ShoppingCart)
+MEMBERSHIPS = {
+    Favorite: favorites,
+    ShoppingCart: shopping_carts,
+}
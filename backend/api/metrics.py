@@ -0,0 +1,239 @@
+import contextvars
+import fcntl
+import glob
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+import api.constants as const
+
+current_timings = contextvars.ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Время, потраченное запросом на БД, сериализацию и рендеринг."""
+
+    def __init__(self):
+        self.queries = 0
+        self.statements = []
+        self.durations = dict.fromkeys(const.METRICS_PHASES, 0.0)
+        self._depth = dict.fromkeys(const.METRICS_PHASES, 0)
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обертка connection.execute_wrapper: считает запросы и их время."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.durations['db'] += duration
+            if len(self.statements) < const.SLOW_REQUEST_MAX_STATEMENTS:
+                self.statements.append((sql, duration))
+
+    @contextmanager
+    def phase(self, name):
+        """Замеряет фазу; вложенные замеры той же фазы не суммируются."""
+        self._depth[name] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[name] -= 1
+            if not self._depth[name]:
+                self.durations[name] += time.perf_counter() - start
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.durations["db"] * 1000:.1f};'
+            f'desc="{self.queries} queries"',
+            *(
+                f'{name};dur={self.durations[name] * 1000:.1f}'
+                for name in const.METRICS_PHASES if name != 'db'
+            ),
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+@contextmanager
+def timed(name):
+    """Замеряет фазу текущего запроса; вне запроса ничего не делает."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+
+class TimedSerializerMixin:
+    """Относит время to_representation к фазе сериализации запроса."""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class MetricsRegistry:
+    """Гистограммы по маршрутам, общие для всех воркеров gunicorn.
+
+    Каждый процесс копит наблюдения в памяти и не чаще раза в
+    METRICS_FLUSH_INTERVAL секунд атомарно сохраняет их в собственный
+    файл <pid>-<время>.json в каталоге METRICS_DIR. При выдаче метрик
+    файлы завершившихся процессов сворачиваются в archive.json и
+    удаляются, а архив суммируется с файлами живых процессов, поэтому
+    счетчики не уменьшаются при перезапуске воркеров, а число файлов не
+    растет. Каталог должен принадлежать одному хосту: живость процесса
+    проверяется по его pid.
+    """
+
+    archive_name = 'archive.json'
+    name_pattern = re.compile(r'^(\d+)-\d+\.json$')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._flushed_at = 0
+        self._pid = None
+
+    @property
+    def path(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._data = {}
+            self._name = f'{self._pid}-{time.time_ns()}.json'
+        return os.path.join(settings.METRICS_DIR, self._name)
+
+    def observe(self, metric, labels, value):
+        buckets = const.METRICS_BUCKETS[metric]
+        key = json.dumps([metric, labels])
+        with self._lock:
+            path = self.path
+            item = self._data.setdefault(key, {
+                'buckets': [0] * (len(buckets) + 1), 'sum': 0, 'count': 0,
+            })
+            item['buckets'][bisect_left(buckets, value)] += 1
+            item['sum'] += value
+            item['count'] += 1
+            if time.monotonic() - self._flushed_at > (
+                const.METRICS_FLUSH_INTERVAL
+            ):
+                self._flush(path)
+
+    def _flush(self, path):
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self._data, file)
+        os.replace(temporary, path)
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def merge(merged, data):
+        for key, item in data.items():
+            total = merged.setdefault(key, {
+                'buckets': [0] * len(item['buckets']),
+                'sum': 0,
+                'count': 0,
+            })
+            for position, count in enumerate(item['buckets']):
+                total['buckets'][position] += count
+            total['sum'] += item['sum']
+            total['count'] += item['count']
+        return merged
+
+    @staticmethod
+    def read(path):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def is_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def fold(self):
+        """Переносит наблюдения завершившихся процессов в архив.
+
+        Выполняется под файловой блокировкой, чтобы воркеры, одновременно
+        отдающие метрики, не свернули один файл дважды.
+        """
+        archive = os.path.join(settings.METRICS_DIR, self.archive_name)
+        with open(f'{archive}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = []
+            for path in glob.glob(
+                os.path.join(settings.METRICS_DIR, '*.json')
+            ):
+                match = self.name_pattern.match(os.path.basename(path))
+                if match and not self.is_alive(int(match[1])):
+                    dead.append(path)
+            if not dead:
+                return
+            merged = self.read(archive)
+            for path in dead:
+                self.merge(merged, self.read(path))
+            temporary = f'{archive}.tmp'
+            with open(temporary, 'w') as file:
+                json.dump(merged, file)
+            os.replace(temporary, archive)
+            for path in dead:
+                os.remove(path)
+
+    def collect(self):
+        """Суммирует наблюдения всех процессов и архива."""
+        with self._lock:
+            self._flush(self.path)
+        self.fold()
+        merged = {}
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            self.merge(merged, self.read(path))
+        return merged
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        series = {}
+        for key, item in self.collect().items():
+            metric, labels = json.loads(key)
+            series.setdefault(metric, []).append((labels, item))
+        lines = []
+        for metric, help_text in const.METRICS_HELP.items():
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for labels, item in sorted(
+                series.get(metric, ()), key=lambda row: row[0]
+            ):
+                label_text = ','.join(
+                    f'{name}="{value}"' for name, value in labels
+                )
+                cumulative = 0
+                for bound, count in zip(
+                    (*const.METRICS_BUCKETS[metric], '+Inf'), item['buckets']
+                ):
+                    cumulative += count
+                    lines.append(
+                        f'{metric}_bucket{{{label_text},le="{bound}"}} '
+                        f'{cumulative}'
+                    )
+                lines.append(f'{metric}_sum{{{label_text}}} {item["sum"]}')
+                lines.append(
+                    f'{metric}_count{{{label_text}}} {item["count"]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
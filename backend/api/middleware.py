@@ -0,0 +1,96 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from api.metrics import RequestTimings, current_timings, metrics
+from api.utils import sql_fingerprint
+
+slow_requests = logging.getLogger('api.slow_requests')
+
+
+class RequestMetricsMiddleware:
+    """Замеряет запрос: SQL, сериализацию и рендеринг.
+
+    Результат отдается клиенту в заголовке Server-Timing и попадает в
+    гистограммы, размеченные именем маршрута (например, recipes-list).
+    Запросы дольше SLOW_REQUEST_THRESHOLD_MS с вероятностью
+    SLOW_REQUEST_SAMPLE_RATE записываются в журнал медленных запросов
+    вместе с шаблонами выполненных SQL-запросов и их временем.
+    Должен стоять первым в MIDDLEWARE, чтобы его process_template_response
+    вызывался непосредственно перед рендерингом ответа.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        total = time.perf_counter() - start
+        response['Server-Timing'] = timings.server_timing(total)
+        match = request.resolver_match
+        route = match.url_name if match else 'unmatched'
+        self.observe(route, request, timings, total)
+        if (
+            total * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS
+            and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE
+        ):
+            self.journal(route, request, response, timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        timings = current_timings.get()
+        if timings is None:
+            return response
+        start = time.perf_counter()
+
+        def rendered(response):
+            timings.durations['render'] += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def observe(self, route, request, timings, total):
+        labels = (('route', route), ('method', request.method))
+        for metric, value in (
+            ('foodgram_request_duration_seconds', total),
+            ('foodgram_db_duration_seconds', timings.durations['db']),
+            ('foodgram_db_queries', timings.queries),
+            ('foodgram_serialize_duration_seconds',
+             timings.durations['serialize']),
+            ('foodgram_render_duration_seconds', timings.durations['render']),
+        ):
+            metrics.observe(metric, labels, value)
+
+    def journal(self, route, request, response, timings, total):
+        user = getattr(request, 'user', None)
+        slow_requests.info(json.dumps({
+            'time': timezone.now().isoformat(),
+            'route': route,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None else None,
+            'params': {key: request.GET.getlist(key) for key in request.GET},
+            'duration_ms': round(total * 1000, 3),
+            'db_ms': round(timings.durations['db'] * 1000, 3),
+            'queries': timings.queries,
+            'statements': [
+                {'sql': sql_fingerprint(sql), 'ms': round(duration * 1000, 3)}
+                for sql, duration in timings.statements
+            ],
+        }, ensure_ascii=False))
@@ -1,7 +1,51 @@
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    page_size = settings.PAGE_SIZE_DEFAULT
+    ordering = '-pk'
 
 
 class CustomPagination(PageNumberPagination):
+    """Постраничная пагинация с опциональным режимом курсора.
+
+    Запрос с ?pagination=cursor или с ?cursor= обслуживается
+    KeysetPagination: без OFFSET и без подсчета общего числа объектов.
+    Курсор задает порядок '-pk', поэтому с сортировкой по релевантности
+    (?search=) он несовместим.
+    """
+
     page_size_query_param = 'limit'
     page_size = settings.PAGE_SIZE_DEFAULT
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    keyset_pagination_class = KeysetPagination
+
+    def __init__(self):
+        self.keyset = None
+
+    @classmethod
+    def is_keyset(cls, request):
+        return (
+            request.query_params.get(cls.mode_query_param) == 'cursor'
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_keyset(request):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_page_meta(self):
+        """Поля ответа пагинации, кроме results, для текущей страницы."""
+        data = self.get_paginated_response([]).data
+        del data['results']
+        return data
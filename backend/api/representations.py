@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from api.memberships import favorites, shopping_carts
+from api.metrics import timed
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe, RecipeIngredient
+
+User = get_user_model()
+
+RECIPE_FIELDS = RecipeReadSerializer.Meta.fields
+RECIPE_COLUMNS = ('name', 'image', 'text', 'cooking_time')
+
+
+def recipe_values(fields=RECIPE_FIELDS):
+    """Поля рецепта для values(): pk нужен KeysetPagination."""
+    return (
+        'pk',
+        *(('author_id',) if 'author' in fields else ()),
+        *(name for name in RECIPE_COLUMNS if name in fields),
+    )
+
+
+def recipe_ids(membership, user):
+    ids = membership.get(user)
+    return membership.load(user.pk) if ids is None else ids
+
+
+def recipe_representations(rows, request, fields=RECIPE_FIELDS):
+    """Рецепты в виде RecipeReadSerializer, собранные из values().
+
+    Теги, авторы и ингредиенты страницы загружаются запросами
+    values_list() и группируются по рецептам без создания моделей и
+    полей сериализатора; связи не из fields не загружаются. Порядок
+    ключей и значения совпадают с RecipeReadSerializer, поэтому JSON
+    ответа не меняется.
+    """
+    ids = [row['pk'] for row in rows]
+    if not ids:
+        return []
+    user = request.user
+    tags = defaultdict(list)
+    if 'tags' in fields:
+        for recipe_id, pk, name, color, slug in (
+            Recipe.tags.through.objects.filter(recipe_id__in=ids)
+            .order_by('tag_id').values_list(
+                'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+            )
+        ):
+            tags[recipe_id].append(
+                {'id': pk, 'name': name, 'color': color, 'slug': slug}
+            )
+    ingredients = defaultdict(list)
+    if 'ingredients' in fields:
+        for recipe_id, pk, name, measurement_unit, amount in (
+            RecipeIngredient.objects.filter(recipe_id__in=ids)
+            .order_by('pk').values_list(
+                'recipe_id', 'ingredient_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'
+            )
+        ):
+            ingredients[recipe_id].append({
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            })
+    authors = {}
+    if 'author' in fields:
+        for username, first_name, last_name, pk, email, is_subscribed in (
+            User.objects.with_is_subscribed(user).filter(
+                pk__in={row['author_id'] for row in rows}
+            ).values_list(
+                'username', 'first_name', 'last_name', 'pk', 'email',
+                'is_subscribed'
+            )
+        ):
+            authors[pk] = {
+                'username': username,
+                'first_name': first_name,
+                'last_name': last_name,
+                'id': pk,
+                'email': email,
+                'is_subscribed': is_subscribed,
+            }
+    favorite_ids = shopping_cart_ids = ()
+    if 'is_favorited' in fields:
+        favorite_ids = recipe_ids(favorites, user)
+    if 'is_in_shopping_cart' in fields:
+        shopping_cart_ids = recipe_ids(shopping_carts, user)
+    storage = Recipe._meta.get_field('image').storage
+    getters = {
+        'id': lambda row: row['pk'],
+        'tags': lambda row: tags[row['pk']],
+        'author': lambda row: authors[row['author_id']],
+        'ingredients': lambda row: ingredients[row['pk']],
+        'is_favorited': lambda row: row['pk'] in favorite_ids,
+        'is_in_shopping_cart': lambda row: row['pk'] in shopping_cart_ids,
+        'image': lambda row: request.build_absolute_uri(
+            storage.url(row['image'])
+        ) if row['image'] else None,
+    }
+    getters = [
+        (name, getters.get(name, lambda row, name=name: row[name]))
+        for name in fields
+    ]
+    with timed('serialize'):
+        return [
+            {name: getter(row) for name, getter in getters}
+            for row in rows
+        ]
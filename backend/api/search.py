@@ -0,0 +1,64 @@
+from bisect import bisect_left
+
+import api.constants as const
+from api.cache import VersionedLocalValue
+from recipes.models import Ingredient, Tag
+
+
+class IngredientPrefixIndex(VersionedLocalValue):
+    """Отсортированный индекс ингредиентов для поиска по началу названия.
+
+    Строится лениво при первом обращении и перестраивается при смене
+    версии пространства кеша ingredients, поэтому изменения каталога,
+    сделанные в других процессах и командой import_csv, видны сразу.
+    """
+
+    namespace = 'ingredients'
+
+    def build(self):
+        rows = sorted(
+            (name.lower(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'pk', 'name', 'measurement_unit'
+            )
+        )
+        return (
+            [row[0] for row in rows],
+            [
+                {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+                for _, pk, name, measurement_unit in rows
+            ],
+        )
+
+    def search(self, prefix, limit=const.INGREDIENT_SEARCH_LIMIT):
+        prefix = prefix.lower()
+        keys, items = self.get()
+        result = []
+        position = bisect_left(keys, prefix)
+        while (
+            position < len(keys)
+            and (limit is None or len(result) < limit)
+            and keys[position].startswith(prefix)
+        ):
+            result.append(items[position])
+            position += 1
+        return result
+
+
+class TagSlugMap(VersionedLocalValue):
+    """Соответствие slug тега его id, следующее за версией кеша tags."""
+
+    namespace = 'tags'
+
+    def build(self):
+        return dict(Tag.objects.values_list('slug', 'pk'))
+
+    def resolve(self, slugs):
+        """Возвращает id известных тегов и признак, что найдены все."""
+        ids = self.get()
+        found = {ids[slug] for slug in slugs if slug in ids}
+        return found, len(found) == len(set(slugs))
+
+
+ingredient_index = IngredientPrefixIndex()
+tag_map = TagSlugMap()
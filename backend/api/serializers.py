@@ -1,28 +1,64 @@
+import os
+
+from django.db import transaction
+from django.utils.functional import cached_property
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 
 import api.constants as const
-from api.utils import Base64ImageField
+from api.memberships import favorites, shopping_carts
+from api.metrics import TimedSerializerMixin
+from api.utils import (Base64ImageField, BulkPrimaryKeyRelatedField,
+                       requested_fields, resolve_pks)
 from api.validators import not_exists_validate, null_unique_validator
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingCartTotal, Tag)
+
+
+class SparseFieldsMixin:
+    """Выводит только поля, выбранные параметрами ?fields= и ?omit=.
+
+    Действует на сериализатор верхнего уровня; вложенные выводятся
+    целиком. Запись и валидация полей не меняются.
+    """
 
+    @cached_property
+    def requested_field_names(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return None
+        return requested_fields(self.context.get('request'), self.Meta.fields)
 
-class RecipeSerializer(serializers.ModelSerializer):
+    @property
+    def _readable_fields(self):
+        fields = super()._readable_fields
+        names = self.requested_field_names
+        if names is None:
+            return fields
+        return (field for field in fields if field.field_name in names)
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time',)
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, UserSerializer
+):
     is_subscribed = SerializerMethodField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('is_subscribed',)
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         return (
             user.is_authenticated
@@ -41,34 +77,29 @@ class SubscribeSerializer(CustomUserSerializer):
         )
 
     def get_recipes(self, obj):
-        author_recipes = Recipe.objects.filter(author=obj)
-
-        if 'recipes_limit' in self.context.get('request').GET:
-            recipes_limit = self.context.get('request').GET['recipes_limit']
-            author_recipes = author_recipes[:int(recipes_limit)]
-
-        if author_recipes:
-            serializer = RecipeSerializer(
-                author_recipes,
-                context={'request': self.context.get('request')},
-                many=True
-            )
-            return serializer.data
-
-        return RecipeSerializer(many=True).data
+        author_recipes = self.context['author_recipes'].get(obj.pk, ())
+        return RecipeSerializer(
+            author_recipes,
+            context={'request': self.context.get('request')},
+            many=True
+        ).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
         read_only_fields = ('id', 'name', 'color', 'slug',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
@@ -93,18 +124,31 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = resolve_pks(
+            Ingredient.objects.all(),
+            [item['ingredient'] for item in items]
+        )
+        for item, ingredient in zip(items, ingredients):
+            item['ingredient'] = ingredient
+        return items
+
+
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
-    )
+    id = serializers.IntegerField(source='ingredient')
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = RecipeIngredientListSerializer
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     tags = TagSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientReadSerializer(
@@ -129,25 +173,41 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'cooking_time'
         )
 
+    def get_recipe_ids(self, membership, name):
+        if name not in self.context:
+            user = self.context.get('request').user
+            ids = membership.get(user)
+            if ids is None:
+                ids = membership.load(user.pk)
+            self.context[name] = ids
+        return self.context[name]
+
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and obj.favorite.filter(user=user).exists()
-        )
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return obj.pk in self.get_recipe_ids(favorites, 'favorite_ids')
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and obj.shopping_cart.filter(user=user).exists()
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return obj.pk in self.get_recipe_ids(
+            shopping_carts, 'shopping_cart_ids'
         )
 
 
-class RecipeWriteSerializer(serializers.ModelSerializer):
+class RecipeWriteSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     author = CustomUserSerializer(read_only=True)
     image = Base64ImageField()
     ingredients = RecipeIngredientWriteSerializer(many=True)
+    tags = BulkPrimaryKeyRelatedField(
+        many=True,
+        queryset=Tag.objects.all(),
+        allow_empty=False,
+        label=Recipe._meta.get_field('tags').verbose_name,
+        error_messages={'empty': const.TAG_NULL_ERROR},
+    )
 
     class Meta:
         model = Recipe
@@ -224,28 +284,79 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         user = self.context.get('request').user
-        recipe = Recipe.objects.create(
-            author=user,
-            **validated_data
-        )
-        recipe.tags.set(tags)
-        self.create_ingredients_in_recipe(recipe, ingredients)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(
+                author=user,
+                **validated_data
+            )
+            recipe.tags.set(tags)
+            self.create_ingredients_in_recipe(recipe, ingredients)
         return recipe
 
+    def update_ingredients_in_recipe(self, recipe, ingredients):
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe
+            )
+        }
+        created, changed, amounts = [], [], {}
+        for ingredient in ingredients:
+            pk, amount = ingredient['ingredient'].pk, ingredient['amount']
+            recipe_ingredient = existing.pop(pk, None)
+            if recipe_ingredient is None:
+                created.append(RecipeIngredient(
+                    recipe=recipe, ingredient_id=pk, amount=amount
+                ))
+                amounts[pk] = amount
+            elif recipe_ingredient.amount != amount:
+                amounts[pk] = amount - recipe_ingredient.amount
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        for pk, recipe_ingredient in existing.items():
+            amounts[pk] = -recipe_ingredient.amount
+        if existing:
+            RecipeIngredient.objects.filter(pk__in=[
+                recipe_ingredient.pk
+                for recipe_ingredient in existing.values()
+            ]).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if created:
+            RecipeIngredient.objects.bulk_create(created)
+        if amounts:
+            ShoppingCartTotal.objects.apply(
+                list(recipe.shopping_cart.values_list('user_id', flat=True)),
+                amounts
+            )
+
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        instance.tags.set(tags)
-        self.create_ingredients_in_recipe(instance, ingredients)
-        return super().update(instance, validated_data)
+        image = validated_data.get('image')
+        if (
+            image is not None
+            and os.path.basename(instance.image.name) == image.name
+        ):
+            validated_data.pop('image')
+        with transaction.atomic():
+            self.update_ingredients_in_recipe(instance, ingredients)
+            instance.tags.set(tags)
+            return super().update(instance, validated_data)
 
     def to_representation(self, instance):
-        context = {'request': self.context.get('request')}
-        return RecipeReadSerializer(instance, context=context).data
-
-
-class FavoriteSerializer(serializers.ModelSerializer):
+        request = self.context.get('request')
+        if 'tags' not in getattr(instance, '_prefetched_objects_cache', {}):
+            instance = Recipe.objects.with_related(
+                request.user,
+                requested_fields(request, RecipeReadSerializer.Meta.fields)
+            ).get(pk=instance.pk)
+        return RecipeReadSerializer(
+            instance, context={'request': request}
+        ).data
+
+
+class FavoriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ('user', 'recipe')
@@ -266,3 +377,35 @@ class FavoriteSerializer(serializers.ModelSerializer):
 class ShoppingCartSerializer(FavoriteSerializer):
     class Meta(FavoriteSerializer.Meta):
         model = ShoppingCart
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            ShoppingCartTotal.objects.add_recipes(
+                (instance.user_id,), (instance.recipe,)
+            )
+        return instance
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=const.BULK_RECIPES_MAX
+    )
+
+
+class ShoppingCartTotalSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    id = serializers.IntegerField(source='ingredient.id', read_only=True)
+    name = serializers.CharField(source='ingredient.name', read_only=True)
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit',
+        read_only=True
+    )
+    amount = serializers.IntegerField(source='total_amount', read_only=True)
+
+    class Meta:
+        model = ShoppingCartTotal
+        fields = ('id', 'name', 'measurement_unit', 'amount')
@@ -0,0 +1,106 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token, invalidate_user_tokens
+from api.cache import bump_cache_version
+from api.memberships import MEMBERSHIPS
+from api.search import ingredient_index, tag_map
+from api.snapshots import ingredient_snapshot
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartTotal, Tag)
+
+User = get_user_model()
+
+
+def invalidate_ingredients():
+    ingredient_index.invalidate()
+    ingredient_snapshot.invalidate()
+    bump_cache_version('ingredients')
+
+
+def invalidate_tags():
+    tag_map.invalidate()
+    bump_cache_version('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients_on_commit(**kwargs):
+    """Увеличивает версию кеша ingredients после коммита.
+
+    Иначе другой воркер увидит новую версию раньше новых данных и
+    закеширует под ней ответ, построенный по старому каталогу.
+    """
+    transaction.on_commit(invalidate_ingredients)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_on_commit(**kwargs):
+    transaction.on_commit(invalidate_tags)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def touch_memberships(sender, instance, **kwargs):
+    transaction.on_commit(partial(MEMBERSHIPS[sender].touch, instance.user_id))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_cart_totals(instance, **kwargs):
+    """Вычитает рецепт из итогов списков покупок до удаления записей.
+
+    Сигнал отправляется и при каскадном удалении, например вместе с
+    автором, пока строки списка покупок и ингредиентов еще существуют.
+    """
+    ShoppingCartTotal.objects.remove_carts(instance.shopping_cart.all())
+
+
+@receiver(post_delete, sender=Recipe)
+def bump_recipes_on_delete(**kwargs):
+    transaction.on_commit(partial(bump_cache_version, 'recipes'))
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_users_on_change(update_fields=None, **kwargs):
+    """Профили авторов входят в представления рецептов и их ETag."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(partial(bump_cache_version, 'users'))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_on_tags_change(instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        recipes = instance.recipes.all()
+    elif reverse and action in ('post_add', 'post_remove'):
+        recipes = Recipe.objects.filter(pk__in=pk_set)
+    elif not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        recipes = Recipe.objects.filter(pk=instance.pk)
+    else:
+        return
+    recipes.update(updated=timezone.now())
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def touch_recipe_on_ingredients_change(instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated=timezone.now()
+    )
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(instance, **kwargs):
+    transaction.on_commit(partial(invalidate_token, instance.key))
+
+
+@receiver((post_save, post_delete), sender=User)
+def forget_changed_user_tokens(instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(partial(invalidate_user_tokens, instance.pk))
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import re
+import threading
+
+from django.core.cache import cache
+
+import api.constants as const
+from api.cache import get_cache_version
+from api.renderers import ORJSONRenderer
+from api.serializers import IngredientSerializer
+from recipes.models import Ingredient
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class IngredientSnapshot:
+    """Весь каталог ингредиентов одним неизменяемым JSON-файлом.
+
+    Снимок сериализуется и сжимается gzip и brotli один раз на версию
+    пространства кеша ingredients, которую сигналы и import_csv
+    увеличивают при изменении каталога. Готовый снимок хранится в общем
+    кеше, чтобы его не строил каждый воркер, и в памяти процесса.
+    Имя файла содержит хеш содержимого, поэтому файл можно кешировать
+    бессрочно. Без пакета brotli отдается только gzip.
+    """
+
+    namespace = 'ingredients'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._snapshot = None
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+            self._snapshot = None
+
+    def build(self):
+        items = list(
+            Ingredient.objects.order_by('pk')
+            .values(*IngredientSerializer.Meta.fields)
+        )
+        content = ORJSONRenderer().render(items)
+        encodings = {
+            'gzip': gzip.compress(
+                content, const.SNAPSHOT_GZIP_LEVEL, mtime=0
+            ),
+        }
+        if brotli is not None:
+            encodings['br'] = brotli.compress(
+                content, quality=const.SNAPSHOT_BROTLI_QUALITY
+            )
+        return {
+            'hash': hashlib.sha256(content).hexdigest()[
+                :const.SNAPSHOT_HASH_LENGTH
+            ],
+            'count': len(items),
+            'content': content,
+            'encodings': encodings,
+        }
+
+    def get(self):
+        version = get_cache_version(self.namespace)
+        with self._lock:
+            if self._snapshot is not None and self._version == version:
+                return self._snapshot
+        key = f'api:{self.namespace}:{version}:snapshot'
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = self.build()
+            cache.set(key, snapshot, const.RESPONSE_CACHE_TIMEOUT)
+        with self._lock:
+            self._version, self._snapshot = version, snapshot
+        return snapshot
+
+
+def accepted_encoding(snapshot, accept_encoding):
+    """Лучшее из заранее сжатых представлений, принимаемых клиентом."""
+    for encoding in ('br', 'gzip'):
+        if encoding in snapshot['encodings'] and re.search(
+            rf'\b{encoding}\b(?!\s*;\s*q=0(?:\.0+)?(?![.\d]))',
+            accept_encoding
+        ):
+            return encoding
+    return None
+
+
+ingredient_snapshot = IngredientSnapshot()
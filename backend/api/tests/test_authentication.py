@@ -0,0 +1,57 @@
+from unittest import mock
+
+from rest_framework.authtoken.models import Token
+
+import api.constants as const
+from api.cache import TTLCache
+from api.tests.base import APITestBase
+
+
+class CachedTokenAuthenticationTests(APITestBase):
+    """Отзыв токена в одном процессе действует в остальных сразу."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.worker = TTLCache(const.TOKEN_CACHE_SIZE, const.TOKEN_CACHE_TTL)
+
+    def get_me(self):
+        with mock.patch('api.authentication.token_cache', self.worker):
+            return self.client.get('/api/users/me/')
+
+    def test_logout_rejects_token_in_other_worker(self):
+        self.assertEqual(self.get_me().status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_deactivation_rejects_token_in_other_worker(self):
+        self.assertEqual(self.get_me().status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_block_rejects_token_in_other_worker(self):
+        self.assertEqual(self.get_me().status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_blocked = True
+            self.user.save()
+
+        response = self.get_me()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], const.USER_IS_BLOCKED)
+
+    def test_cached_token_skips_database(self):
+        with mock.patch('api.authentication.token_cache', self.worker):
+            self.assertEqual(self.client.get('/api/tags/').status_code, 200)
+            with self.assertNumQueries(0):
+                self.client.get('/api/tags/')
@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.db.models import QuerySet
+
+import api.constants as const
+from api.tests.base import APITestBase
+from recipes.models import (Ingredient, RecipeIngredient, ShoppingCart,
+                            ShoppingCartTotal)
+
+
+class BulkShoppingCartTests(APITestBase):
+    """Массовое добавление учитывает только вставленные строки."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        ingredient = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        self.recipes = [
+            self.create_recipe(self.user, f'Рецепт {index}')
+            for index in range(3)
+        ]
+        for recipe in self.recipes:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=100
+            )
+
+    def post(self):
+        return self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'recipes': [recipe.pk for recipe in self.recipes]},
+            format='json',
+        )
+
+    def test_skipped_rows_are_not_counted(self):
+        bulk_create = QuerySet.bulk_create
+
+        def skip_first(queryset, objs, *args, **kwargs):
+            objs = list(objs)
+            if queryset.model is ShoppingCart:
+                objs = objs[1:]
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', skip_first):
+            response = self.post()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['status'] for item in response.json()['results']],
+            [const.BULK_ALREADY_ADDED, const.BULK_ADDED, const.BULK_ADDED],
+        )
+        self.assertEqual(
+            ShoppingCartTotal.objects.get(user=self.user).total_amount, 200
+        )
+
+    def test_repeated_request_changes_nothing(self):
+        self.post()
+
+        response = self.post()
+
+        self.assertEqual(
+            {item['status'] for item in response.json()['results']},
+            {const.BULK_ALREADY_ADDED},
+        )
+        self.assertEqual(
+            ShoppingCart.objects.filter(user=self.user).count(), 3
+        )
+        self.assertEqual(
+            ShoppingCartTotal.objects.get(user=self.user).total_amount, 300
+        )
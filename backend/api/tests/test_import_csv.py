@@ -0,0 +1,50 @@
+import io
+import os
+
+from django.core.management import call_command
+
+from api.tests.base import APITestBase
+from recipes.models import Ingredient, Tag
+
+
+class ImportCsvTests(APITestBase):
+    """Импортированные данные видны индексам в памяти процесса сразу."""
+
+    def import_csv(self, catalog, text):
+        path = os.path.join(self.tmp, f'{catalog}.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        call_command(
+            'import_csv', path, catalog=catalog, stdout=io.StringIO()
+        )
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_imported_ingredients_are_found_at_once(self):
+        Ingredient.objects.create(name='абрикос', measurement_unit='г')
+        self.assertEqual(self.search('абр'), ['абрикос'])
+
+        self.import_csv(
+            'ingredients',
+            'name,measurement_unit\nабрикосовое варенье,г\n',
+        )
+
+        self.assertEqual(
+            self.search('абр'), ['абрикос', 'абрикосовое варенье']
+        )
+
+    def test_imported_tags_filter_recipes_at_once(self):
+        recipe = self.create_recipe(self.create_user())
+        response = self.client.get('/api/recipes/', {'tags': 'breakfast'})
+        self.assertEqual(response.json()['count'], 0)
+
+        self.import_csv('tags', 'name,color,slug\nЗавтрак,#ffff00,breakfast\n')
+        recipe.tags.add(Tag.objects.get(slug='breakfast'))
+
+        response = self.client.get('/api/recipes/', {'tags': 'breakfast'})
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']], [recipe.pk]
+        )
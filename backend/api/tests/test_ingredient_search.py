@@ -0,0 +1,85 @@
+import io
+import os
+from unittest import mock
+
+from django.core.management import call_command
+
+from api.cache import get_cache_version
+from api.search import IngredientPrefixIndex
+from api.tests.base import APITestBase
+from recipes.models import Ingredient
+
+
+class IngredientSearchTests(APITestBase):
+    """Закешированный поиск ?name= не отстает от каталога."""
+
+    def setUp(self):
+        super().setUp()
+        Ingredient.objects.create(name='абрикос', measurement_unit='г')
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def import_ingredients(self, text):
+        path = os.path.join(self.tmp, 'ingredients.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('name,measurement_unit\n' + text)
+        call_command(
+            'import_csv', path, catalog='ingredients', stdout=io.StringIO()
+        )
+
+    def test_cached_search_follows_import(self):
+        self.assertEqual(self.search('абр'), ['абрикос'])
+
+        self.import_ingredients('абрикосовый джем,г\n')
+
+        expected = ['абрикос', 'абрикосовый джем']
+        self.assertEqual(self.search('абр'), expected)
+        self.assertEqual(self.search('АБР'), expected)
+
+    def test_other_worker_index_follows_import(self):
+        worker = IngredientPrefixIndex()
+        with mock.patch('api.views.ingredient_index', worker):
+            self.assertEqual(self.search('абр'), ['абрикос'])
+
+        self.import_ingredients('абрикосовый джем,г\n')
+
+        with mock.patch('api.views.ingredient_index', worker):
+            self.assertEqual(
+                self.search('абр'), ['абрикос', 'абрикосовый джем']
+            )
+
+    def test_version_changes_after_commit(self):
+        version = get_cache_version('ingredients')
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(
+                name='абрикосовый джем', measurement_unit='г'
+            )
+            self.assertEqual(get_cache_version('ingredients'), version)
+        self.assertNotEqual(get_cache_version('ingredients'), version)
+        self.assertEqual(
+            self.search('абр'), ['абрикос', 'абрикосовый джем']
+        )
+
+    def test_limit_returns_page(self):
+        for name in ('абрикосовый джем', 'абрикосовый сок', 'абсент'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+        response = self.client.get(
+            '/api/ingredients/', {'name': 'аб', 'limit': 2, 'offset': 1}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual(page['count'], 4)
+        self.assertIsNotNone(page['next'])
+        self.assertIsNotNone(page['previous'])
+        self.assertEqual(
+            [item['name'] for item in page['results']],
+            ['абрикосовый джем', 'абрикосовый сок'],
+        )
+        self.assertEqual(
+            set(page['results'][0]), {'id', 'name', 'measurement_unit'}
+        )
@@ -0,0 +1,54 @@
+from api.memberships import RecipeMembership
+from api.tests.base import APITestBase
+from recipes.models import Favorite, ShoppingCart
+
+
+class RecipeMembershipTests(APITestBase):
+    """Множества избранного в других процессах следуют за базой."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.recipes = [
+            self.create_recipe(self.user, f'Рецепт {index}')
+            for index in range(3)
+        ]
+        self.worker = RecipeMembership(Favorite)
+
+    def test_orm_changes_reach_other_worker(self):
+        first, second, _ = self.recipes
+        self.assertEqual(self.worker.get(self.user), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=first)
+            Favorite.objects.create(user=self.user, recipe=second)
+        self.assertEqual(self.worker.get(self.user), {first.pk, second.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.filter(recipe=first).delete()
+        self.assertEqual(self.worker.get(self.user), {second.pk})
+
+    def test_bulk_add_reaches_other_worker(self):
+        self.assertEqual(self.worker.get(self.user), set())
+        self.client.force_authenticate(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/recipes/favorite/',
+                {'recipes': [recipe.pk for recipe in self.recipes]},
+                format='json',
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.worker.get(self.user),
+            {recipe.pk for recipe in self.recipes},
+        )
+
+    def test_other_model_is_independent(self):
+        self.assertEqual(self.worker.get(self.user), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+
+        self.assertEqual(self.worker.get(self.user), set())
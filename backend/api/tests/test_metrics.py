@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.test import override_settings
+
+from api.metrics import MetricsRegistry
+from api.tests.base import APITestBase
+
+METRIC = 'foodgram_request_duration_seconds'
+
+
+def dead_pid():
+    process = subprocess.Popen((sys.executable, '-c', ''))
+    process.wait()
+    return process.pid
+
+
+class MetricsRegistryTests(APITestBase):
+    """Файлы завершившихся процессов сворачиваются в архив."""
+
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(METRICS_DIR=self.tmp)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.registry = MetricsRegistry()
+
+    def write(self, name, count):
+        key = json.dumps([METRIC, [['route', 'recipes-list']]])
+        with open(os.path.join(self.tmp, name), 'w') as file:
+            json.dump({key: {
+                'buckets': [count, 0], 'sum': count, 'count': count,
+            }}, file)
+
+    def count(self):
+        return sum(
+            item['count'] for key, item in self.registry.collect().items()
+            if json.loads(key)[0] == METRIC
+        )
+
+    def test_dead_process_files_are_folded_once(self):
+        self.write(f'{dead_pid()}-1.json', 2)
+        self.write(f'{dead_pid()}-2.json', 3)
+        self.write(f'{os.getppid()}-3.json', 5)
+
+        self.assertEqual(self.count(), 10)
+        self.assertEqual(self.count(), 10)
+        self.assertEqual(sorted(
+            name for name in os.listdir(self.tmp) if name.endswith('.json')
+        ), sorted((
+            MetricsRegistry.archive_name,
+            f'{os.getppid()}-3.json',
+            os.path.basename(self.registry.path),
+        )))
+
+
+class MetricsViewTests(APITestBase):
+    """Без METRICS_TOKEN метрики доступны только администраторам."""
+
+    @override_settings(METRICS_TOKEN='')
+    def test_without_token_requires_admin(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        self.client.force_authenticate(self.create_user())
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        self.client.force_authenticate(
+            self.create_user('admin', is_staff=True)
+        )
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(
+            self.client.get(
+                '/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong'
+            ).status_code,
+            403,
+        )
+        self.assertEqual(
+            self.client.get(
+                '/api/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+            ).status_code,
+            200,
+        )
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import APITestBase
+
+
+class CursorPaginationTests(APITestBase):
+    """Режим курсора не считает и не агрегирует всю выборку."""
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user()
+        self.recipes = [
+            self.create_recipe(author, f'Рецепт {index}')
+            for index in range(5)
+        ]
+
+    def get(self, params, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/', params, **headers)
+        return response, [query['sql'] for query in queries]
+
+    def test_cursor_page_queries(self):
+        response, queries = self.get({'pagination': 'cursor', 'limit': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.json())
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [recipe.pk for recipe in self.recipes[:-3:-1]],
+        )
+        self.assertEqual(len(queries), 5)
+        self.assertFalse(
+            [sql for sql in queries if 'COUNT(' in sql.upper()]
+        )
+
+    def test_cursor_not_modified_queries(self):
+        response, _ = self.get({'pagination': 'cursor', 'limit': 2})
+
+        response, queries = self.get(
+            {'pagination': 'cursor', 'limit': 2},
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(
+            [sql for sql in queries if 'COUNT(' in sql.upper()]
+        )
+
+    def test_search_with_cursor_is_rejected(self):
+        response, _ = self.get({'search': 'Рецепт', 'pagination': 'cursor'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.json())
@@ -0,0 +1,191 @@
+import base64
+import io
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+
+from api.memberships import favorites, shopping_carts
+from api.search import ingredient_index, tag_map
+from api.snapshots import ingredient_snapshot
+from api.tests.base import APITestBase
+from api.utils import sql_fingerprint
+from recipes.management.endpoints import call, get_requests
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+DUMMY_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+
+# Наибольшее число SQL-запросов на действие api при холодных кешах.
+BUDGETS = {
+    ('users-list', 'get'): 2,
+    ('users-me', 'get'): 1,
+    ('users-detail', 'get'): 1,
+    ('users-subscriptions', 'get'): 3,
+    ('users-subscribe', 'post'): 4,
+    ('users-subscribe', 'delete'): 3,
+    ('tags-list', 'get'): 1,
+    ('tags-detail', 'get'): 1,
+    ('ingredients-list', 'get'): 1,
+    ('ingredients-detail', 'get'): 1,
+    ('ingredients-snapshot', 'get'): 1,
+    ('recipes-list', 'get'): 10,
+    ('recipes-list', 'post'): 16,
+    ('recipes-detail', 'get'): 7,
+    ('recipes-detail', 'patch'): 23,
+    ('recipes-detail', 'delete'): 11,
+    ('recipes-favorite', 'post'): 8,
+    ('recipes-favorite', 'delete'): 6,
+    ('recipes-shopping-cart', 'post'): 17,
+    ('recipes-shopping-cart', 'delete'): 13,
+    ('recipes-favorite-bulk', 'post'): 7,
+    ('recipes-favorite-bulk', 'delete'): 7,
+    ('recipes-shopping-cart-bulk', 'post'): 14,
+    ('recipes-shopping-cart-bulk', 'delete'): 14,
+    ('recipes-shopping-cart-summary', 'get'): 1,
+    ('recipes-download-shopping-cart', 'get'): 1,
+}
+
+# Объемы данных: бюджеты не должны зависеть от размера страницы,
+# числа тегов, ингредиентов, авторов и рецептов в запросе.
+SCALES = (
+    {
+        'users': 6, 'recipes': 12, 'ingredients': 1, 'tags_per_recipe': 1,
+        'subscriptions': 1, 'favorites': 1, 'cart': 1,
+    },
+    {
+        'users': 40, 'recipes': 150, 'ingredients': 10,
+        'tags_per_recipe': 5, 'subscriptions': 10, 'favorites': 20,
+        'cart': 10,
+    },
+)
+
+
+@override_settings(CACHES=DUMMY_CACHES)
+class QueryBudgetTests(APITestBase):
+    """Каждое действие api укладывается в бюджет SQL-запросов.
+
+    Проверка идет на малом и большом наборе данных, для анонима и
+    пользователя, при холодных кешах. При превышении тест падает со
+    списком запросов, сгруппированных по шаблону.
+    """
+
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(MEDIA_ROOT=self.tmp)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.reset_caches)
+
+    def reset_caches(self):
+        for cache in (favorites, shopping_carts):
+            cache.clear()
+        tag_map.invalidate()
+        ingredient_index.invalidate()
+        ingredient_snapshot.invalidate()
+
+    def test_small_scale(self):
+        self.check_scale(SCALES[0])
+
+    def test_large_scale(self):
+        self.check_scale(SCALES[1])
+
+    def check_scale(self, scale):
+        call_command(
+            'seed_benchmark_data', catalog=200, stdout=io.StringIO(),
+            **scale
+        )
+        user = User.objects.get(username='bench_0')
+        failures = []
+        for name, method, label, url, data, client_user in self.get_calls(
+            user, scale
+        ):
+            self.reset_caches()
+            response, queries, _ = call(url, client_user, method, data)
+            who = 'auth' if client_user else 'anon'
+            budget = BUDGETS.get((name, method))
+            title = (
+                f'{method.upper()} {label} {who}: '
+                f'{response.status_code}, queries={len(queries)}, '
+                f'budget={budget}'
+            )
+            if method != 'get' and response.status_code >= 400:
+                failures.append(f'{title}\n  {response.content[:300]}')
+            elif budget is None or len(queries) > budget:
+                failures.append('\n'.join((title, *(
+                    f'  {count} x {fingerprint}'
+                    for fingerprint, count in Counter(
+                        sql_fingerprint(query['sql']) for query in queries
+                    ).most_common()
+                ))))
+        if failures:
+            self.fail(
+                f'Превышено бюджетов: {len(failures)}.\n'
+                + '\n'.join(failures)
+            )
+
+    def get_calls(self, user, scale):
+        """Запросы для проверки: (маршрут, метод, метка, url, тело, кто)."""
+        for name, label, url in get_requests():
+            for client_user in (None, user):
+                yield name, 'get', label, url, None, client_user
+        size = scale['ingredients']
+        recipes = list(
+            Recipe.objects.exclude(author=user)
+            .exclude(favorite__user=user)
+            .exclude(shopping_cart__user=user)
+            .values_list('pk', flat=True)[:size]
+        )
+        for name, kwargs, data in (
+            ('recipes-favorite', {'pk': recipes[0]}, None),
+            ('recipes-shopping-cart', {'pk': recipes[0]}, None),
+            ('recipes-favorite-bulk', None, {'recipes': recipes}),
+            ('recipes-shopping-cart-bulk', None, {'recipes': recipes}),
+            ('users-subscribe', {'user_id': User.objects.exclude(
+                pk=user.pk
+            ).exclude(subscribing__user=user).values_list(
+                'pk', flat=True
+            ).first()}, None),
+        ):
+            url = reverse(f'api:{name}', kwargs=kwargs)
+            for method in ('post', 'delete'):
+                yield name, method, name, url, data, user
+        yield (
+            'recipes-list', 'post', 'recipes-list',
+            reverse('api:recipes-list'), self.get_recipe_data(size), user
+        )
+        url = reverse('api:recipes-detail', kwargs={
+            'pk': Recipe.objects.filter(author=user).latest('pk').pk
+        })
+        yield (
+            'recipes-detail', 'patch', 'recipes-detail', url,
+            self.get_recipe_data(size, offset=size), user
+        )
+        yield 'recipes-detail', 'delete', 'recipes-detail', url, None, user
+
+    def get_recipe_data(self, size, offset=0):
+        buffer = io.BytesIO()
+        Image.new('RGB', (2, 2), (offset, 0, 0)).save(buffer, 'PNG')
+        ingredients = Ingredient.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )[offset:offset + size]
+        tags = Tag.objects.order_by('pk').values_list('pk', flat=True)
+        return {
+            'name': 'Проверка бюджета',
+            'text': 'Проверка бюджета запросов',
+            'cooking_time': 10,
+            'image': 'data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode(),
+            'ingredients': [
+                {'id': pk, 'amount': 10} for pk in ingredients
+            ],
+            'tags': list(tags[offset:offset + size] or tags[:1]),
+        }
@@ -0,0 +1,120 @@
+import time
+
+from django.utils.http import http_date
+
+from api.tests.base import APITestBase
+from recipes.models import Favorite, Tag
+
+
+class RecipeETagTests(APITestBase):
+    """ETag списка рецептов меняется вместе с телом ответа."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#ffff00', slug='breakfast'
+        )
+        self.recipes = [
+            self.create_recipe(self.user, f'Рецепт {index}', (self.tag,))
+            for index in range(4)
+        ]
+
+    def get(self, etag=None, path='/api/recipes/'):
+        headers = {} if etag is None else {'HTTP_IF_NONE_MATCH': etag}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(path, **headers)
+
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+
+    def test_tag_rename_changes_etag(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Ранний завтрак'
+            self.tag.save()
+
+        response = self.get(etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'][0]['tags'][0]['name'],
+            'Ранний завтрак'
+        )
+
+    def test_author_profile_change_changes_etag(self):
+        etag = self.get(path=f'/api/recipes/{self.recipes[0].pk}/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Другое'
+            self.user.save()
+
+        response = self.get(etag, f'/api/recipes/{self.recipes[0].pk}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author']['first_name'], 'Другое')
+
+    def test_swapped_favorites_change_etag(self):
+        self.client.force_authenticate(self.user)
+        first, second, third, fourth = self.recipes
+        for recipe in (first, fourth):
+            Favorite.objects.create(user=self.user, recipe=recipe)
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.filter(user=self.user).delete()
+            for recipe in (second, third):
+                Favorite.objects.create(user=self.user, recipe=recipe)
+
+        response = self.get(etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {
+                item['id'] for item in response.json()['results']
+                if item['is_favorited']
+            },
+            {second.pk, third.pk},
+        )
+
+
+class RecipeLastModifiedTests(APITestBase):
+    """Списки не проверяются по дате: их страницы сдвигаются без нее."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.recipes = [
+            self.create_recipe(self.user, f'Рецепт {index}')
+            for index in range(8)
+        ]
+
+    def test_new_recipe_shifts_page(self):
+        params = {'page': 2, 'limit': 6}
+        response = self.client.get('/api/recipes/', params)
+        self.assertNotIn('Last-Modified', response)
+        ids = [item['id'] for item in response.json()['results']]
+        self.create_recipe(self.user, 'Новый рецепт')
+
+        response = self.client.get(
+            '/api/recipes/',
+            params,
+            HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(
+            [item['id'] for item in response.json()['results']], ids
+        )
+
+    def test_detail_is_dated(self):
+        path = f'/api/recipes/{self.recipes[0].pk}/'
+        response = self.client.get(path)
+
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(
+            self.client.get(
+                path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            ).status_code,
+            304,
+        )
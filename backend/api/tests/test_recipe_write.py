@@ -0,0 +1,30 @@
+import api.constants as const
+from api.tests.base import APITestBase
+from recipes.models import Recipe, Tag
+
+
+class RecipeWriteTests(APITestBase):
+    """Проверка тегов при создании рецепта."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.create_user())
+
+    def test_empty_tags_are_rejected(self):
+        response = self.client.post(
+            '/api/recipes/', {'tags': []}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['tags'], [const.TAG_NULL_ERROR])
+
+    def test_unknown_tag_is_rejected(self):
+        tag = Tag.objects.create(name='Обед', color='#00ff00', slug='lunch')
+
+        response = self.client.post(
+            '/api/recipes/', {'tags': [tag.pk, tag.pk + 1]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.json())
+        self.assertFalse(Recipe.objects.exists())
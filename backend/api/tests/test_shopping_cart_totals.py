@@ -0,0 +1,51 @@
+from api.tests.base import APITestBase
+from recipes.models import Ingredient, RecipeIngredient, ShoppingCartTotal
+
+
+class ShoppingCartTotalsTests(APITestBase):
+    """Итоги списка покупок следуют за удалением рецептов."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.buyer = self.create_user('buyer')
+        self.recipe = self.create_recipe(self.author)
+        RecipeIngredient.objects.create(
+            recipe=self.recipe,
+            ingredient=Ingredient.objects.create(
+                name='мука', measurement_unit='г'
+            ),
+            amount=100,
+        )
+        self.client.force_authenticate(self.buyer)
+        response = self.client.post(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            ShoppingCartTotal.objects.get(user=self.buyer).total_amount, 100
+        )
+
+    def assert_cart_is_empty(self):
+        self.client.force_authenticate(self.buyer)
+        self.assertFalse(ShoppingCartTotal.objects.filter(user=self.buyer))
+        response = self.client.get('/api/recipes/shopping_cart_summary/')
+        self.assertEqual(response.json(), [])
+
+    def test_author_account_deletion(self):
+        self.client.force_authenticate(self.author)
+
+        response = self.client.delete(
+            '/api/users/me/', {'current_password': 'password'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 204)
+        self.assert_cart_is_empty()
+
+    def test_recipe_deletion(self):
+        self.client.force_authenticate(self.author)
+
+        response = self.client.delete(f'/api/recipes/{self.recipe.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assert_cart_is_empty()
@@ -0,0 +1,37 @@
+import gzip
+import io
+import json
+import os
+
+from django.core.management import call_command
+
+from api.tests.base import APITestBase
+
+ENTRY = {
+    'route': 'recipes-list',
+    'duration_ms': 600,
+    'db_ms': 150,
+    'queries': 2,
+    'statements': [{'sql': 'SELECT 1', 'ms': 5}],
+}
+
+
+class SlowReportTests(APITestBase):
+    """Сводка читает текущий журнал и его сжатые архивы logrotate."""
+
+    def test_reads_rotated_archives(self):
+        path = os.path.join(self.tmp, 'slow.ndjson')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(ENTRY) + '\n')
+        with gzip.open(f'{path}.1.gz', 'wt', encoding='utf-8') as file:
+            file.write(json.dumps(ENTRY) + '\n')
+        stdout = io.StringIO()
+
+        with self.settings(SLOW_REQUEST_LOG=path):
+            call_command('slow_report', json=True, stdout=stdout)
+
+        routes = json.loads(stdout.getvalue())['routes']
+        self.assertEqual(
+            [(item['route'], item['requests']) for item in routes],
+            [('recipes-list', 2)],
+        )
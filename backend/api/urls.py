@@ -1,8 +1,9 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework import routers
 
 from api.views import (CustomTokenCreateView, CustomUserViewSet,
-                       IngredientViewSet, RecipeViewSet, TagViewSet)
+                       IngredientSnapshotView, IngredientViewSet, MetricsView,
+                       RecipeViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -14,6 +15,12 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    re_path(
+        r'^ingredients/snapshot/(?P<digest>[0-9a-f]+)\.json$',
+        IngredientSnapshotView.as_view(),
+        name='ingredients-snapshot-file'
+    ),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path(
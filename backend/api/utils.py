@@ -1,14 +1,143 @@
 import base64
+import binascii
+import hashlib
+import io
+import re
 
 from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+import api.constants as const
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+SQL_LISTS = re.compile(r'\((?:\s*\?\s*,)*\s*\?\s*\)')
+
+
+def sql_fingerprint(sql):
+    """Приводит SQL к шаблону: литералы и списки IN заменяются на '?'."""
+    sql = SQL_LITERALS.sub('?', sql)
+    sql = SQL_LISTS.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+def requested_fields(request, available):
+    """Поля из available, оставленные параметрами ?fields= и ?omit=.
+
+    Параметры принимают имена через запятую и могут повторяться.
+    Неизвестные имена пропускаются, порядок полей сохраняется.
+    """
+    if request is None:
+        return tuple(available)
+    params = request.query_params
+
+    def names(param):
+        return {
+            name.strip()
+            for value in params.getlist(param)
+            for name in value.split(',')
+        } - {''}
+
+    selected = names(const.FIELDS_QUERY_PARAM)
+    omitted = names(const.OMIT_QUERY_PARAM)
+    return tuple(
+        name for name in available
+        if (not selected or name in selected) and name not in omitted
+    )
+
+
+def resolve_pks(queryset, values):
+    """Находит объекты по списку id одним запросом, сохраняя порядок."""
+    pks = []
+    for value in values:
+        try:
+            pks.append(int(value))
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(
+                const.OBJECT_ID_ERROR.format(value)
+            )
+    objects = queryset.in_bulk(set(pks))
+    missing = sorted({pk for pk in pks if pk not in objects})
+    if missing:
+        raise serializers.ValidationError(const.OBJECTS_NOT_EXIST_ERROR.format(
+            ', '.join(map(str, missing))
+        ))
+    return [objects[pk] for pk in pks]
+
+
+def decode_base64_image(data):
+    """Декодирует изображение из data URL и нормализует его через Pillow.
+
+    Ограничение на размер проверяется по длине base64-строки до
+    декодирования, ограничение на число пикселей — по заголовку файла до
+    распаковки растра. Имя файла — хеш нормализованного содержимого.
+    """
+    _, _, encoded = data.partition(';base64,')
+    if len(encoded) > (const.IMAGE_MAX_BYTES + 2) // 3 * 4:
+        raise serializers.ValidationError(const.IMAGE_SIZE_ERROR.format(
+            const.IMAGE_MAX_BYTES // (1024 * 1024)
+        ))
+    try:
+        raw = base64.b64decode(encoded, validate=True)
+        with Image.open(io.BytesIO(raw)) as image:
+            if image.width * image.height > const.IMAGE_MAX_PIXELS:
+                raise serializers.ValidationError(
+                    const.IMAGE_PIXELS_ERROR.format(const.IMAGE_MAX_PIXELS)
+                )
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((const.IMAGE_MAX_SIDE, const.IMAGE_MAX_SIDE))
+            has_alpha = (
+                image.mode in ('RGBA', 'LA')
+                or 'transparency' in image.info
+            )
+            buffer = io.BytesIO()
+            if has_alpha:
+                extension = 'png'
+                image.convert('RGBA').save(buffer, 'PNG', optimize=True)
+            else:
+                extension = 'jpg'
+                image.convert('RGB').save(
+                    buffer,
+                    'JPEG',
+                    quality=const.IMAGE_JPEG_QUALITY,
+                    optimize=True,
+                )
+    except (binascii.Error, ValueError, OSError,
+            Image.DecompressionBombError):
+        raise serializers.ValidationError(const.IMAGE_INVALID_ERROR)
+    content = buffer.getvalue()
+    return ContentFile(
+        content,
+        name=f'{hashlib.sha256(content).hexdigest()}.{extension}'
+    )
 
 
 class Base64ImageField(serializers.ImageField):
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='image.' + ext)
+            return decode_base64_image(data)
         return super().to_internal_value(data)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return resolve_pks(self.child_relation.get_queryset(), data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """При many=True находит все объекты одним запросом IN."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
@@ -1,23 +1,47 @@
+import hashlib
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import TokenCreateView, UserViewSet
-from rest_framework import status, viewsets
+from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import (NotFound, PermissionDenied,
+                                       ValidationError)
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 import api.constants as const
+from api.cache import VersionedCacheMixin, get_cache_versions
+from api.exports import EXPORTERS, shopping_cart_rows
 from api.filters import IngredientFilter, RecipeFilter
+from api.memberships import MEMBERSHIPS
+from api.metrics import metrics
 from api.pagination import CustomPagination
 from api.permissions import IsAdminOrAuthorOrReadOnly
-from api.serializers import (FavoriteSerializer, IngredientSerializer,
+from api.renderers import CSVRenderer, PlainTextRenderer
+from api.representations import (RECIPE_FIELDS, recipe_representations,
+                                 recipe_values)
+from api.search import ingredient_index
+from api.serializers import (CustomUserSerializer, FavoriteSerializer,
+                             IngredientSerializer, RecipeIdsSerializer,
                              RecipeWriteSerializer, ShoppingCartSerializer,
-                             SubscribeSerializer, TagSerializer)
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+                             ShoppingCartTotalSerializer, SubscribeSerializer,
+                             TagSerializer)
+from api.snapshots import accepted_encoding, ingredient_snapshot
+from api.utils import requested_fields
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingCartTotal, Tag)
 from users.models import Subscribe
 
 User = get_user_model()
@@ -27,15 +51,51 @@ class CustomUserViewSet(UserViewSet):
     pagination_class = CustomPagination
     lookup_url_kwarg = 'user_id'
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve') and 'is_subscribed' in (
+            requested_fields(self.request, CustomUserSerializer.Meta.fields)
+        ):
+            queryset = queryset.with_is_subscribed(self.request.user)
+        return queryset
+
     def get_permissions(self):
 
         if self.action == 'me':
             self.permission_classes = (IsAuthenticated,)
         return super().get_permissions()
 
-    def get_subscribe_serializer(self, *args, **kwargs):
-        kwargs.setdefault('context', self.get_serializer_context())
-        return SubscribeSerializer(*args, **kwargs)
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get(
+            'recipes_limit', const.RECIPES_LIMIT_MAX
+        )
+        try:
+            recipes_limit = int(recipes_limit)
+        except (TypeError, ValueError):
+            recipes_limit = -1
+        if recipes_limit < 0:
+            raise ValidationError({
+                'recipes_limit': const.RECIPES_LIMIT_ERROR.format(
+                    const.RECIPES_LIMIT_MAX
+                )
+            })
+        return min(recipes_limit, const.RECIPES_LIMIT_MAX)
+
+    def get_subscribe_fields(self):
+        return requested_fields(self.request, SubscribeSerializer.Meta.fields)
+
+    def get_subscribe_serializer(self, instance, **kwargs):
+        authors = instance if kwargs.get('many') else (instance,)
+        author_recipes = {}
+        if 'recipes' in self.get_subscribe_fields():
+            for recipe in Recipe.objects.limited_by_author(
+                    authors, self.get_recipes_limit()
+            ):
+                author_recipes.setdefault(recipe.author_id, []).append(recipe)
+        context = self.get_serializer_context()
+        context['author_recipes'] = author_recipes
+        kwargs.setdefault('context', context)
+        return SubscribeSerializer(instance, **kwargs)
 
     def create_subscribe(self, request, author):
 
@@ -54,7 +114,13 @@ class CustomUserViewSet(UserViewSet):
                 {'errors': const.ALREADY_IS_SUBSCRIBE.format(author)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        serializer = self.get_subscribe_serializer(subscribe.author)
+        serializer = self.get_subscribe_serializer(
+            User.objects.subscriptions_of(
+                request.user, self.get_subscribe_fields()
+            ).get(
+                pk=subscribe.author_id
+            )
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_subscribe(self, request, author):
@@ -78,7 +144,9 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
 
-        queryset = User.objects.filter(subscribing__user=request.user)
+        queryset = User.objects.subscriptions_of(
+            request.user, self.get_subscribe_fields()
+        )
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_subscribe_serializer(page, many=True)
@@ -124,19 +192,106 @@ class CustomTokenCreateView(TokenCreateView):
             status=status.HTTP_201_CREATED)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class MetricsView(APIView):
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        if settings.METRICS_TOKEN:
+            if not constant_time_compare(
+                request.headers.get('Authorization', ''),
+                f'Bearer {settings.METRICS_TOKEN}'
+            ):
+                raise PermissionDenied(const.METRICS_TOKEN_ERROR)
+        elif not (request.user.is_authenticated and request.user.is_admin):
+            raise PermissionDenied(const.METRICS_ACCESS_ERROR)
+        return HttpResponse(
+            metrics.render(), content_type=const.METRICS_CONTENT_TYPE
+        )
+
+
+class TagViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     permission_classes = (AllowAny,)
 
+    def normalize_query_params(self, query_params):
+        query_params = query_params.copy()
+        if 'name' in query_params:
+            query_params['name'] = query_params['name'].lower()
+        return super().normalize_query_params(query_params)
+
+    def search(self, request):
+        items = ingredient_index.search(
+            request.query_params['name'], limit=None
+        )
+        page = self.paginate_queryset(items)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(items[:const.INGREDIENT_SEARCH_LIMIT])
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(self.search, request)
+
+    @action(
+        methods=('GET',),
+        detail=False,
+    )
+    def snapshot(self, request):
+        snapshot = ingredient_snapshot.get()
+        etag = quote_etag(snapshot['hash'])
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            response = Response({
+                'hash': snapshot['hash'],
+                'count': snapshot['count'],
+                'url': request.build_absolute_uri(reverse(
+                    'api:ingredients-snapshot-file', args=(snapshot['hash'],)
+                )),
+            })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class IngredientSnapshotView(APIView):
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request, digest):
+        snapshot = ingredient_snapshot.get()
+        if digest != snapshot['hash']:
+            raise NotFound(const.SNAPSHOT_NOT_FOUND.format(digest))
+        encoding = accepted_encoding(
+            snapshot, request.headers.get('Accept-Encoding', '')
+        )
+        etag = quote_etag(f'{digest}-{encoding}' if encoding else digest)
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                snapshot['encodings'].get(encoding, snapshot['content']),
+                content_type='application/json',
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = (
+            f'public, max-age={const.SNAPSHOT_MAX_AGE}, immutable'
+        )
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
@@ -146,6 +301,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAdminOrAuthorOrReadOnly,)
     pagination_class = CustomPagination
 
+    def get_conditional_response(self, request, rows, build, meta=None,
+                                 dated=False):
+        """Ответ 304 или ответ build() с ETag окна выдачи.
+
+        ETag строится по строкам страницы: их флагам из fingerprint(),
+        полям пагинации и версиям пространств кеша тегов, ингредиентов
+        и пользователей, поэтому переименование тега или правка профиля
+        автора меняют его без изменения самих рецептов. Представления
+        рецептов собираются, только если клиентская копия устарела.
+
+        Last-Modified отдается анониму только для одного рецепта
+        (dated=True): состав страницы списка меняется при создании
+        рецепта или снятии тега без изменения дат ее строк, поэтому
+        списки проверяются только по ETag.
+        """
+        user = request.user
+        fingerprint = Recipe.objects.filter(
+            pk__in=[row['pk'] for row in rows]
+        ).fingerprint(user) if rows else []
+        versions = get_cache_versions(const.RECIPE_CACHE_NAMESPACES)
+        etag = quote_etag(hashlib.sha256(repr((
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            user.pk,
+            meta,
+            [row['pk'] for row in rows],
+            fingerprint,
+            sorted(versions.items()),
+        )).encode()).hexdigest())
+        last_modified = None
+        if dated and not user.is_authenticated:
+            last_modified = int(max(
+                *(row[1].timestamp() for row in fingerprint),
+                *(version / 10 ** 9 for version in versions.values()),
+            ))
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = build()
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        fields = requested_fields(request, RECIPE_FIELDS)
+        queryset = self.filter_queryset(Recipe.objects.all()).values(
+            *recipe_values(fields)
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows = list(queryset)
+            return self.get_conditional_response(
+                request,
+                rows,
+                lambda: Response(
+                    recipe_representations(rows, request, fields)
+                ),
+            )
+        return self.get_conditional_response(
+            request,
+            page,
+            lambda: self.get_paginated_response(
+                recipe_representations(page, request, fields)
+            ),
+            self.paginator.get_page_meta(),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = requested_fields(request, RECIPE_FIELDS)
+        row = generics.get_object_or_404(
+            self.filter_queryset(Recipe.objects.all()).values(
+                *recipe_values(fields)
+            ),
+            pk=kwargs[self.lookup_field]
+        )
+        return self.get_conditional_response(
+            request,
+            (row,),
+            lambda: Response(
+                recipe_representations((row,), request, fields)[0]
+            ),
+            dated=True,
+        )
+
     def methods_for_actions(self, pk, serializer_class):
         user = self.request.user
 
@@ -165,17 +406,81 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 data={'user': user.id, 'recipe': pk},
                 context={'request': self.request}
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            with transaction.atomic():
+                User.objects.lock((user.id,))
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if self.request.method == 'DELETE':
             if obj is None:
                 return Response({'errors': const.RECIPE_NOT_EXIST},
                                 status=status.HTTP_400_BAD_REQUEST)
-            obj.delete()
+            with transaction.atomic():
+                User.objects.lock((user.id,))
+                deleted, _ = obj.delete()
+                if deleted and serializer_class.Meta.model is ShoppingCart:
+                    ShoppingCartTotal.objects.remove_recipes(
+                        (user.id,), (recipe,)
+                    )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def bulk_methods_for_actions(self, model):
+        serializer = RecipeIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        user = self.request.user
+        pks = list(dict.fromkeys(serializer.validated_data['recipes']))
+
+        with transaction.atomic():
+            User.objects.lock((user.pk,))
+            found = set(
+                Recipe.objects.filter(pk__in=pks)
+                .values_list('pk', flat=True)
+            )
+            present = set(
+                model.objects.filter(user=user, recipe_id__in=pks)
+                .values_list('recipe_id', flat=True)
+            )
+            if self.request.method == 'POST':
+                missing = [pk for pk in pks if pk in found - present]
+                model.objects.bulk_create(
+                    (model(user=user, recipe_id=pk) for pk in missing),
+                    ignore_conflicts=True
+                )
+                inserted = set(
+                    model.objects.filter(user=user, recipe_id__in=missing)
+                    .values_list('recipe_id', flat=True)
+                )
+                changed = [pk for pk in missing if pk in inserted]
+                if model is ShoppingCart:
+                    ShoppingCartTotal.objects.add_recipes((user.id,), changed)
+                transaction.on_commit(
+                    partial(MEMBERSHIPS[model].touch, user.id)
+                )
+                changed_status = const.BULK_ADDED
+                unchanged_status = const.BULK_ALREADY_ADDED
+            else:
+                changed = [pk for pk in pks if pk in present]
+                model.objects.filter(user=user, recipe_id__in=changed).delete()
+                if model is ShoppingCart:
+                    ShoppingCartTotal.objects.remove_recipes(
+                        (user.id,), changed
+                    )
+                changed_status = const.BULK_REMOVED
+                unchanged_status = const.BULK_NOT_ADDED
+
+        changed = set(changed)
+        return Response({'results': [
+            {
+                'id': pk,
+                'status': (
+                    const.BULK_NOT_FOUND if pk not in found
+                    else changed_status if pk in changed
+                    else unchanged_status
+                ),
+            } for pk in pks
+        ]}, status=status.HTTP_200_OK)
+
     @action(
         methods=['POST', 'DELETE'],
         detail=True
@@ -190,28 +495,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk):
         return self.methods_for_actions(pk, ShoppingCartSerializer)
 
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_methods_for_actions(Favorite)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_methods_for_actions(ShoppingCart)
+
     @action(
         methods=['GET', ],
-        detail=False
+        detail=False,
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_summary(self, request):
+        serializer = ShoppingCartTotalSerializer(
+            ShoppingCartTotal.objects.filter(user=request.user)
+            .select_related('ingredient')
+            .order_by('ingredient__name'),
+            many=True
+        )
+        return Response(serializer.data)
+
+    @action(
+        methods=['GET', ],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
     )
     def download_shopping_cart(self, request):
-        ingredient_list = (
-            RecipeIngredient.objects.filter(
-                recipe__shopping_cart__user=request.user
-            )
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .order_by('ingredient__name')
-            .annotate(total_summ=Sum('amount'))
-        )
-        result = const.SHOPING_CART_TEMPLATE.format(request.user) + '\n'
-        result += '\n'.join(const.SHOPING_CART.format(
-            ingredient['ingredient__name'],
-            ingredient['total_summ'],
-            ingredient['ingredient__measurement_unit']
-        ) for ingredient in ingredient_list)
-
-        response = HttpResponse(result, content_type='text/plain')
+        file_format = request.accepted_renderer.format
+        exporter = EXPORTERS[file_format]
+        response = StreamingHttpResponse(
+            exporter(request.user, shopping_cart_rows(request.user)),
+            content_type=(
+                f'{request.accepted_renderer.media_type}; charset=utf-8'
+            ),
+        )
         response['Content-Disposition'] = (
-            f'attachment; filename={const.SHOPING_CART_FILE_NAME}'
+            'attachment; filename='
+            f'{const.SHOPING_CART_FILE_NAME.format(file_format)}'
         )
         return response
@@ -1,8 +1,10 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingCartTotal, Tag)
 
 
 @admin.register(Tag)
@@ -32,6 +34,33 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
         except RecipeIngredient.ingredient.RelatedObjectDoesNotExist:
             return '----'
 
+    def save_model(self, request, obj, form, change):
+        totals = ShoppingCartTotal.objects
+        if change:
+            totals.apply_recipe_ingredients(
+                RecipeIngredient.objects.filter(pk=obj.pk), sign=-1
+            )
+        super().save_model(request, obj, form, change)
+        totals.apply_recipe_ingredients(
+            RecipeIngredient.objects.filter(pk=obj.pk)
+        )
+
+    def delete_model(self, request, obj):
+        ShoppingCartTotal.objects.apply_recipe_ingredients(
+            RecipeIngredient.objects.filter(pk=obj.pk), sign=-1
+        )
+        super().delete_model(request, obj)
+        Recipe.objects.filter(pk=obj.recipe_id).update(updated=timezone.now())
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        ShoppingCartTotal.objects.apply_recipe_ingredients(queryset, sign=-1)
+        super().delete_queryset(request, queryset)
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated=timezone.now()
+        )
+
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
@@ -68,3 +97,21 @@ class FavoriteAdmin(admin.ModelAdmin):
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe',)
+
+    def save_model(self, request, obj, form, change):
+        totals = ShoppingCartTotal.objects
+        if change:
+            totals.remove_carts(ShoppingCart.objects.filter(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        totals.add_recipes((obj.user_id,), (obj.recipe_id,))
+
+    def delete_model(self, request, obj):
+        ShoppingCartTotal.objects.remove_carts(
+            ShoppingCart.objects.filter(pk=obj.pk)
+        )
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        ShoppingCartTotal.objects.remove_carts(queryset)
+        super().delete_queryset(request, queryset)
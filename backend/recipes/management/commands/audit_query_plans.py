@@ -0,0 +1,162 @@
+import json
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count
+
+from api.utils import sql_fingerprint
+from recipes.management.endpoints import api_settings, call, get_requests
+
+User = get_user_model()
+
+SQLITE_ACCESS = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\w+)')
+SQLITE_SORT = re.compile(r'^USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)')
+POSTGRES_SORTS = ('Sort', 'Incremental Sort')
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет GET-маршруты роутера api от имени анонима и '
+        'пользователя, снимает планы всех SELECT-запросов '
+        '(EXPLAIN ANALYZE, BUFFERS на PostgreSQL, EXPLAIN QUERY PLAN на '
+        'SQLite) и отмечает последовательное чтение и сортировку больших '
+        'таблиц. Все запросы выполняются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя; по умолчанию самый активный покупатель.'
+        )
+        parser.add_argument(
+            '--large-table', type=int, default=1000,
+            help='Число строк, начиная с которого таблица считается большой.'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Печатать полный план для отмеченных запросов.'
+        )
+
+    def handle(self, *args, **options):
+        self.min_rows = options['large_table']
+        self.large_tables = self.get_large_tables()
+        user = self.get_user(options['user'])
+        plans = {}
+        endpoints = defaultdict(list)
+        with api_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+            }},
+        ), transaction.atomic():
+            for _, label, url in get_requests():
+                for client_user in (None, user):
+                    who = 'auth' if client_user else 'anon'
+                    response, queries, _ = call(url, client_user)
+                    flagged = 0
+                    for sql in (query['sql'] for query in queries):
+                        if not sql.lstrip().upper().startswith('SELECT'):
+                            continue
+                        fingerprint = sql_fingerprint(sql)
+                        if fingerprint not in plans:
+                            plans[fingerprint] = self.explain(sql)
+                        endpoints[fingerprint].append(f'{label} [{who}]')
+                        flagged += bool(plans[fingerprint][1])
+                    self.stdout.write(
+                        f'{label:<45} {who:<4} {response.status_code} '
+                        f'queries={len(queries):<3} flagged={flagged}'
+                    )
+            transaction.set_rollback(True)
+        self.report(plans, endpoints, options['plans'])
+
+    def get_large_tables(self):
+        return {
+            model._meta.db_table for model in apps.get_models()
+            if model._default_manager.count() >= self.min_rows
+        }
+
+    def get_user(self, pk):
+        if pk is not None:
+            return User.objects.get(pk=pk)
+        return User.objects.annotate(
+            carts=Count('shopping_cart')
+        ).order_by('-carts', 'pk').first()
+
+    def explain(self, sql):
+        """Возвращает план запроса и список замечаний к нему."""
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(
+                        'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql
+                    )
+                    plan = cursor.fetchone()[0][0]['Plan']
+                    return plan, self.check_postgres(plan)
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+                return plan, self.check_sqlite(plan)
+        except DatabaseError as error:
+            return None, [f'explain failed: {error}']
+
+    def check_postgres(self, node):
+        issues = []
+        rows = node.get('Actual Rows', 0) * node.get('Actual Loops', 1)
+        relation = node.get('Relation Name')
+        if node['Node Type'] == 'Seq Scan' and relation in self.large_tables:
+            issues.append(f'seq scan {relation} rows={rows}')
+        if node['Node Type'] in POSTGRES_SORTS and (
+            rows >= self.min_rows or node.get('Sort Space Type') == 'Disk'
+        ):
+            issues.append(
+                f'sort {", ".join(node.get("Sort Key", ()))} rows={rows} '
+                f'{node.get("Sort Method", "")} '
+                f'{node.get("Sort Space Type", "")}'.rstrip()
+            )
+        for child in node.get('Plans', ()):
+            issues.extend(self.check_postgres(child))
+        return issues
+
+    def check_sqlite(self, plan):
+        issues = []
+        tables = set()
+        for detail in plan:
+            access = SQLITE_ACCESS.match(detail)
+            if not access:
+                continue
+            tables.add(access.group(2))
+            if (
+                access.group(1) == 'SCAN'
+                and access.group(2) in self.large_tables
+                and ' USING ' not in detail
+            ):
+                issues.append(f'seq scan {access.group(2)}')
+        if tables & self.large_tables:
+            issues.extend(
+                f'temp b-tree for {sort.group(1).lower()}'
+                for sort in map(SQLITE_SORT.match, plan) if sort
+            )
+        return issues
+
+    def report(self, plans, endpoints, show_plans):
+        flagged = [
+            (fingerprint, plan, issues)
+            for fingerprint, (plan, issues) in plans.items() if issues
+        ]
+        self.stdout.write(
+            f'\nstatements={len(plans)} flagged={len(flagged)} '
+            f'large tables: {", ".join(sorted(self.large_tables)) or "-"}'
+        )
+        for fingerprint, plan, issues in flagged:
+            self.stdout.write(self.style.WARNING('\n' + '; '.join(issues)))
+            self.stdout.write(
+                '  endpoints: '
+                + ', '.join(sorted(set(endpoints[fingerprint])))
+            )
+            self.stdout.write(f'  {fingerprint}')
+            if show_plans and plan is not None:
+                self.stdout.write(
+                    json.dumps(plan, indent=2, ensure_ascii=False)
+                )
@@ -0,0 +1,100 @@
+import json
+import platform
+import statistics
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from recipes.management.endpoints import api_settings, call, get_requests
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга для отсортированного списка."""
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа GET-маршрутов api в процессе через тестовый '
+        'клиент DRF и выводит p50/p95/p99 и число SQL-запросов в JSON. '
+        'Данные для замеров создает команда seed_benchmark_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя; по умолчанию самый активный покупатель.'
+        )
+        parser.add_argument(
+            '--match', default='',
+            help='Замерять только маршруты, метка которых содержит строку.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для отчета; по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.get(pk=options['user']) if options['user']
+            else User.objects.annotate(
+                carts=Count('shopping_cart')
+            ).order_by('-carts', 'pk').first()
+        )
+        results = []
+        with api_settings():
+            for _, label, url in get_requests():
+                if options['match'] not in label:
+                    continue
+                for client_user in (None, user):
+                    results.append(self.measure(
+                        label, url, client_user, options
+                    ))
+        report = json.dumps({
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'repeat': options['repeat'],
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+            },
+            'results': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def measure(self, label, url, user, options):
+        for _ in range(options['warmup']):
+            call(url, user)
+        timings = []
+        queries = []
+        for _ in range(options['repeat']):
+            response, captured, elapsed = call(url, user)
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+        timings.sort()
+        return {
+            'endpoint': label,
+            'url': url,
+            'user': 'auth' if user else 'anon',
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': max(queries),
+        }
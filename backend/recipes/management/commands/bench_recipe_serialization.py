@@ -0,0 +1,96 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from api.representations import (RECIPE_FIELDS, recipe_representations,
+                                 recipe_values)
+from api.serializers import RecipeReadSerializer
+from api.utils import requested_fields
+from recipes.management.endpoints import api_settings
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение RecipeReadSerializer и сборки рецептов из values(), '
+        'а также рендереров JSON и orjson: страниц в секунду для разных '
+        'размеров страницы. Проверяет, что JSON ответов совпадает '
+        'побайтово.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=(6, 50, 200)
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--user', help='Username пользователя; по умолчанию аноним.'
+        )
+        parser.add_argument('--fields', help='Значение параметра ?fields=.')
+        parser.add_argument('--omit', help='Значение параметра ?omit=.')
+
+    def handle(self, *args, **options):
+        user = AnonymousUser()
+        if options['user']:
+            user = User.objects.get(username=options['user'])
+        request = Request(APIRequestFactory().get('/api/recipes/', {
+            name: options[name] for name in ('fields', 'omit')
+            if options[name]
+        }))
+        request.user = user
+        fields = requested_fields(request, RECIPE_FIELDS)
+        builders = {
+            'serializer': lambda size: RecipeReadSerializer(
+                Recipe.objects.with_related(user, fields)[:size],
+                many=True,
+                context={'request': request},
+            ).data,
+            'values': lambda size: recipe_representations(
+                list(Recipe.objects.values(*recipe_values(fields))[:size]),
+                request,
+                fields,
+            ),
+        }
+        renderers = {'json': JSONRenderer(), 'orjson': ORJSONRenderer()}
+        with api_settings():
+            for size in options['sizes']:
+                self.compare(size, options['repeat'], builders, renderers)
+
+    def compare(self, size, repeat, builders, renderers):
+        outputs = {}
+        for builder_name, build in builders.items():
+            for renderer_name, renderer in renderers.items():
+                name = f'{builder_name}+{renderer_name}'
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    outputs[name] = renderer.render(build(size))
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                median = timings[len(timings) // 2]
+                self.stdout.write(
+                    f'size={size:<4} {name:<18} '
+                    f'median={median * 1000:8.2f} ms '
+                    f'{1 / median:8.1f} pages/s '
+                    f'{size / median:10.1f} recipes/s'
+                )
+        expected = outputs['serializer+json']
+        for name, output in outputs.items():
+            if output != expected:
+                position = next((
+                    index for index, (left, right)
+                    in enumerate(zip(expected, output)) if left != right
+                ), min(len(expected), len(output)))
+                raise CommandError(
+                    f'size={size}: {name} отличается от serializer+json '
+                    f'с байта {position}: {output[position:position + 80]!r}'
+                    f' вместо {expected[position:position + 80]!r}'
+                )
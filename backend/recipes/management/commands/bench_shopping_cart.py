@@ -0,0 +1,145 @@
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+import api.constants as const
+from api.views import RecipeViewSet
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingCartTotal)
+
+User = get_user_model()
+
+
+def legacy_download_shopping_cart(request):
+    """Прежняя реализация выгрузки: весь файл собирается в памяти."""
+    ingredient_list = (
+        RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user=request.user
+        )
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .order_by('ingredient__name')
+        .annotate(total_summ=Sum('amount'))
+    )
+    result = const.SHOPING_CART_TEMPLATE.format(request.user) + '\n'
+    result += '\n'.join(const.SHOPING_CART.format(
+        ingredient['ingredient__name'],
+        ingredient['total_summ'],
+        ingredient['ingredient__measurement_unit']
+    ) for ingredient in ingredient_list)
+    return HttpResponse(result, content_type='text/plain')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение выгрузки списка покупок с прежней реализацией: '
+        'время до первого байта и пиковый объем памяти. '
+        'Тестовые данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options)
+            for file_format in ('txt', 'csv', 'json'):
+                self.report(
+                    f'stream {file_format}', self.streaming, user, file_format
+                )
+            self.report('legacy txt', self.legacy, user)
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        user = User.objects.create_user(
+            username='bench_shopping_cart',
+            email='bench_shopping_cart@example.com',
+            password=None,
+        )
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+        if not ingredient_ids:
+            ingredient_ids = [
+                ingredient.pk for ingredient in Ingredient.objects.bulk_create(
+                    Ingredient(name=f'bench {number}', measurement_unit='г')
+                    for number in range(options['ingredients'] * 10)
+                )
+            ]
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f'bench {number}',
+                text='bench',
+                cooking_time=1,
+                image='recipes/bench.png',
+            ) for number in range(options['recipes'])
+        )
+        if not recipes[0].pk:
+            recipes = list(Recipe.objects.filter(author=user))
+        recipe_ingredients = [
+            RecipeIngredient(recipe=recipe, ingredient_id=pk, amount=1)
+            for recipe in recipes
+            for pk in rng.sample(
+                ingredient_ids,
+                min(options['ingredients'], len(ingredient_ids))
+            )
+        ]
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe) for recipe in recipes
+        )
+        ShoppingCartTotal.objects.apply((user.pk,), Counter(
+            recipe_ingredient.ingredient_id
+            for recipe_ingredient in recipe_ingredients
+        ))
+        return user
+
+    def get_request(self, user, file_format=None):
+        url = '/api/recipes/download_shopping_cart/'
+        if file_format:
+            url += f'?format={file_format}'
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=user)
+        return request
+
+    def streaming(self, user, file_format):
+        view = RecipeViewSet.as_view(
+            {'get': 'download_shopping_cart'},
+            **RecipeViewSet.download_shopping_cart.kwargs
+        )
+        request = self.get_request(user, file_format)
+        start = time.perf_counter()
+        response = view(request)
+        content = iter(response.streaming_content)
+        size = len(next(content))
+        first_byte = time.perf_counter() - start
+        size += sum(len(chunk) for chunk in content)
+        return first_byte, time.perf_counter() - start, size
+
+    def legacy(self, user):
+        request = self.get_request(user)
+        request.user = user
+        start = time.perf_counter()
+        response = legacy_download_shopping_cart(request)
+        first_byte = time.perf_counter() - start
+        return first_byte, first_byte, len(response.content)
+
+    def report(self, name, measure, *args):
+        tracemalloc.start()
+        first_byte, total, size = measure(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{name:<12} ttfb={first_byte * 1000:8.2f} ms '
+            f'total={total * 1000:8.2f} ms '
+            f'peak={peak / 1024:9.1f} KiB size={size} B'
+        )
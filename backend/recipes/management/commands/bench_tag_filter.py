@@ -0,0 +1,117 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django_filters.rest_framework import FilterSet, filters
+from rest_framework.test import APIRequestFactory
+
+import api.constants as const
+from api.filters import RecipeFilter
+from api.search import tag_map
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+class LegacyRecipeFilter(FilterSet):
+    """Прежний фильтр: варианты slug строятся запросом DISTINCT."""
+
+    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+
+    class Meta:
+        model = Recipe
+        fields = ('tags',)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение фильтрации рецептов по тегам с прежней реализацией '
+        'на AllValuesMultipleFilter. Тестовые данные создаются в '
+        'транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=20)
+        parser.add_argument('--selected', type=int, default=12)
+        parser.add_argument('--tags-per-recipe', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            slugs = self.seed(options)
+            tag_map.invalidate()
+            params = QueryDict(mutable=True)
+            params.setlist('tags', slugs[:options['selected']])
+            request = APIRequestFactory().get('/api/recipes/')
+            request.user = None
+            self.report(
+                'legacy', options['repeat'], LegacyRecipeFilter, params,
+                request
+            )
+            for match in (const.TAGS_MATCH_ANY, const.TAGS_MATCH_ALL):
+                params['tags_match'] = match
+                self.report(
+                    f'exists {match}', options['repeat'], RecipeFilter,
+                    params, request
+                )
+            transaction.set_rollback(True)
+        tag_map.invalidate()
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        user = User.objects.create_user(
+            username='bench_tag_filter',
+            email='bench_tag_filter@example.com',
+            password=None,
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(
+                name=f'bench {number}',
+                color=f'#{number:06X}',
+                slug=f'bench-{number}',
+            ) for number in range(options['tags'])
+        )
+        if not tags[0].pk:
+            tags = list(Tag.objects.filter(slug__startswith='bench-'))
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user,
+                name=f'bench {number}',
+                text='bench',
+                cooking_time=1,
+                image='recipes/bench.png',
+            ) for number in range(options['recipes'])
+        )
+        if not recipes[0].pk:
+            recipes = list(Recipe.objects.filter(author=user))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+            for recipe in recipes
+            for tag in rng.sample(
+                tags, min(options['tags_per_recipe'], len(tags))
+            )
+        )
+        return [tag.slug for tag in tags]
+
+    def report(self, name, repeat, filterset_class, params, request):
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                filterset = filterset_class(
+                    params, queryset=Recipe.objects.all(), request=request
+                )
+                rows = list(filterset.qs.values_list('pk', flat=True))
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        self.stdout.write(
+            f'{name:<10} median={timings[len(timings) // 2] * 1000:8.2f} ms '
+            f'queries={len(queries) / repeat:4.1f} rows={len(rows)} '
+            f'unique={len(set(rows))}'
+        )
@@ -0,0 +1,15 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает тесты бюджетов SQL-запросов api '
+        '(api.tests.test_query_budgets) в тестовой базе.'
+    )
+
+    def handle(self, *args, **options):
+        call_command(
+            'test', 'api.tests.test_query_budgets',
+            verbosity=options['verbosity'],
+        )
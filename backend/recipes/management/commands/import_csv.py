@@ -1,35 +1,222 @@
 import csv
+import io
+import json
 import os
+from itertools import islice
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from api.constants import PULL_SUCCSESS
+import api.constants as const
+from api.cache import bump_cache_version
 from recipes.models import Ingredient, Tag
 
-User = get_user_model()
+CATALOGS = {
+    'ingredients': {
+        'model': Ingredient,
+        'key': ('name', 'measurement_unit'),
+        'file': 'ingredients.csv',
+    },
+    'tags': {
+        'model': Tag,
+        'key': ('slug',),
+        'file': 'tags.csv',
+    },
+}
+FORMATS = {
+    '.csv': 'csv',
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+def read_rows(file, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(file, delimiter=',')
+    elif file_format == 'json':
+        yield from json.load(file)
+    else:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
-    help = 'Импорт данных из CSV в Базу данных Postgres'
+    help = (
+        'Импорт справочников ингредиентов и тегов из CSV, JSON или NDJSON. '
+        'Повторный запуск не создает дубликатов: строки сопоставляются '
+        'по названию и единице измерения ингредиента и по слагу тега.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help='Файлы для импорта, по умолчанию data/ingredients.csv '
+                 'и data/tags.csv'
+        )
+        parser.add_argument(
+            '--catalog',
+            choices=CATALOGS,
+            default='ingredients',
+            help='Справочник, в который импортируются переданные файлы'
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(set(FORMATS.values())),
+            help='Формат файлов, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=const.IMPORT_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Не использовать COPY даже на PostgreSQL'
+        )
+
+    def handle(self, *args, **options):
+        if options['files']:
+            jobs = [(options['catalog'], path) for path in options['files']]
+        else:
+            jobs = [
+                (catalog, os.path.join(
+                    settings.BASE_DIR, 'data/', parameter['file']
+                ))
+                for catalog, parameter in CATALOGS.items()
+            ]
+        self.batch_size = options['batch_size']
+        self.use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        with transaction.atomic():
+            for catalog, path in jobs:
+                self.import_file(CATALOGS[catalog], path, options['format'])
+        for catalog in {catalog for catalog, _ in jobs}:
+            bump_cache_version(catalog)
+
+    def import_file(self, catalog, path, file_format):
+        file_format = file_format or FORMATS.get(
+            os.path.splitext(path)[1].lower()
+        )
+        if file_format is None:
+            raise CommandError(const.PULL_FORMAT_ERROR.format(path))
+        model = catalog['model']
+        fields = tuple(
+            field.name for field in model._meta.concrete_fields
+            if not field.primary_key
+        )
+        name = os.path.basename(path)
+        with open(path, 'r', encoding='utf-8') as file:
+            rows = self.clean_rows(read_rows(file, file_format), fields, name)
+            if self.use_copy:
+                self.copy_upsert(model, catalog['key'], fields, rows)
+            else:
+                self.bulk_upsert(model, catalog['key'], fields, rows)
+        self.stdout.write(const.PULL_SUCCSESS.format(name))
+
+    def clean_rows(self, rows, fields, name):
+        for row in rows:
+            missing = [field for field in fields if field not in row]
+            if missing:
+                raise CommandError(
+                    const.PULL_COLUMNS_ERROR.format(name, ', '.join(missing))
+                )
+            yield {field: str(row[field]).strip() for field in fields}
+
+    def progress(self, model, total):
+        self.stdout.write(const.PULL_PROGRESS.format(
+            model._meta.verbose_name_plural, total
+        ))
+
+    def bulk_upsert(self, model, key, fields, rows):
+        update_fields = [field for field in fields if field not in key]
+        total = 0
+        for batch in batches(rows, self.batch_size):
+            unique = {tuple(row[field] for field in key): row for row in batch}
+            existing = {
+                tuple(getattr(obj, field) for field in key): obj
+                for obj in model.objects.filter(**{
+                    f'{key[0]}__in': {row[key[0]] for row in batch}
+                })
+            }
+            created, changed = [], []
+            for natural_key, row in unique.items():
+                obj = existing.get(natural_key)
+                if obj is None:
+                    created.append(model(**row))
+                elif any(
+                    getattr(obj, field) != row[field]
+                    for field in update_fields
+                ):
+                    for field in update_fields:
+                        setattr(obj, field, row[field])
+                    changed.append(obj)
+            model.objects.bulk_create(created, batch_size=self.batch_size)
+            if changed:
+                model.objects.bulk_update(
+                    changed, update_fields, batch_size=self.batch_size
+                )
+            total += len(batch)
+            self.progress(model, total)
 
-    def handle(self, *args, **kwargs):
-        patch_full = [
-            {'file': 'ingredients.csv', 'obj': Ingredient},
-            {'file': 'tags.csv', 'obj': Tag},
+    def copy_upsert(self, model, key, fields, rows):
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(
+            connection.ops.quote_name(
+                model._meta.get_field(field).column
+            ) for field in fields
+        )
+        key_columns = ', '.join(
+            connection.ops.quote_name(
+                model._meta.get_field(field).column
+            ) for field in key
+        )
+        update_columns = [
+            connection.ops.quote_name(model._meta.get_field(field).column)
+            for field in fields if field not in key
         ]
-        for parameter in patch_full:
-            patch = os.path.join(settings.BASE_DIR, 'data/', parameter['file'])
-            with open(patch, 'r', encoding='utf-8') as f_csv:
-                reader = csv.reader(f_csv, delimiter=',')
-                header = next(reader)
-                try:
-                    for row in reader:
-                        object_dict = {
-                            key: value for key, value in zip(header, row)
-                        }
-                        parameter['obj'].objects.create(**object_dict)
-                except (ValueError, TypeError) as error:
-                    self.stdout.write('Ошибка :{}.'.format(error))
-            self.stdout.write(PULL_SUCCSESS.format(parameter['file']))
+        if update_columns:
+            conflict = 'DO UPDATE SET ' + ', '.join(
+                f'{column} = EXCLUDED.{column}' for column in update_columns
+            )
+        else:
+            conflict = 'DO NOTHING'
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE import_rows ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            for batch in batches(rows, self.batch_size):
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [row[field] for field in fields] for row in batch
+                )
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY import_rows ({columns}) FROM STDIN WITH CSV',
+                    buffer
+                )
+                total += len(batch)
+                self.progress(model, total)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT ON ({key_columns}) {columns} '
+                f'FROM import_rows ON CONFLICT ({key_columns}) {conflict}'
+            )
+            cursor.execute('DROP TABLE import_rows')
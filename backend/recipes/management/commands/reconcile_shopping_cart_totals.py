@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, ShoppingCartTotal
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка итогов списков покупок с содержимым корзин '
+        'и пересборка таблицы итогов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, не исправляя их'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = {
+                (row['recipe__shopping_cart__user'], row['ingredient']):
+                    row['total_amount']
+                for row in RecipeIngredient.objects.filter(
+                    recipe__shopping_cart__isnull=False
+                ).values(
+                    'recipe__shopping_cart__user', 'ingredient'
+                ).annotate(total_amount=Sum('amount')).order_by()
+            }
+            actual = {
+                (user_id, ingredient_id): total_amount
+                for user_id, ingredient_id, total_amount
+                in ShoppingCartTotal.objects.select_for_update().values_list(
+                    'user_id', 'ingredient_id', 'total_amount'
+                )
+            }
+            missing = expected.keys() - actual.keys()
+            extra = actual.keys() - expected.keys()
+            wrong = {
+                key for key in expected.keys() & actual.keys()
+                if expected[key] != actual[key]
+            }
+            self.stdout.write(
+                f'Строк ожидается: {len(expected)}, в таблице: {len(actual)}.'
+                f' Отсутствует: {len(missing)}, лишних: {len(extra)},'
+                f' с неверным количеством: {len(wrong)}.'
+            )
+            for user_id, ingredient_id in sorted(missing | extra | wrong):
+                self.stdout.write(
+                    f'  user={user_id} ingredient={ingredient_id}: '
+                    f'{actual.get((user_id, ingredient_id), 0)} -> '
+                    f'{expected.get((user_id, ingredient_id), 0)}'
+                )
+            if options['check'] or not (missing or extra or wrong):
+                return
+            ShoppingCartTotal.objects.all().delete()
+            ShoppingCartTotal.objects.bulk_create(
+                ShoppingCartTotal(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total_amount,
+                )
+                for (user_id, ingredient_id), total_amount in expected.items()
+            )
+            self.stdout.write(
+                self.style.SUCCESS('Таблица итогов пересобрана.')
+            )
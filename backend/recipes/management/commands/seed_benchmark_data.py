@@ -0,0 +1,189 @@
+import random
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.cache import bump_cache_version
+from api.memberships import MEMBERSHIPS
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartTotal, Tag)
+from users.models import Subscribe
+
+User = get_user_model()
+
+PREFIX = 'bench'
+WORDS = (
+    'суп', 'борщ', 'салат', 'пирог', 'каша', 'рагу', 'омлет', 'паста',
+    'запеканка', 'котлеты', 'блины', 'плов', 'соус', 'десерт', 'хлеб',
+)
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для бенчмарков: '
+        'пользователи, теги, ингредиенты, рецепты, подписки, избранное '
+        'и списки покупок. Данные воспроизводимы при одинаковом --seed; '
+        'предыдущие данные бенчмарка удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--ingredients', type=int, default=8,
+                            help='Ингредиентов в рецепте.')
+        parser.add_argument('--catalog', type=int, default=2000,
+                            help='Ингредиентов в справочнике.')
+        parser.add_argument('--tags', type=int, default=12)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Подписок на пользователя.')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Рецептов в избранном пользователя.')
+        parser.add_argument('--cart', type=int, default=10,
+                            help='Рецептов в списке покупок пользователя.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.flush()
+            users = self.create_users(options['users'])
+            tags = self.create_tags(options['tags'])
+            ingredients = self.create_ingredients(options['catalog'])
+            recipes = self.create_recipes(users, options['recipes'])
+            amounts = self.fill_recipes(
+                recipes, tags, ingredients, options
+            )
+            self.create_relations(users, recipes, amounts, options)
+        bump_cache_version('tags')
+        bump_cache_version('ingredients')
+        for membership in MEMBERSHIPS.values():
+            for user in users:
+                membership.touch(user.pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, рецептов {len(recipes)}, '
+            f'тегов {len(tags)}, ингредиентов {len(ingredients)}.'
+        ))
+
+    def flush(self):
+        User.objects.filter(username__startswith=f'{PREFIX}_').delete()
+        Tag.objects.filter(slug__startswith=f'{PREFIX}-').delete()
+        Ingredient.objects.filter(name__startswith=f'{PREFIX} ').delete()
+
+    def bulk_create(self, model, objects, **lookup):
+        """bulk_create, возвращающий объекты с pk на любой СУБД."""
+        created = model.objects.bulk_create(objects, batch_size=1000)
+        if created and created[0].pk is None:
+            return list(model.objects.filter(**lookup).order_by('pk'))
+        return created
+
+    def create_users(self, count):
+        password = make_password(PREFIX)
+        return self.bulk_create(User, (
+            User(
+                username=f'{PREFIX}_{number}',
+                email=f'{PREFIX}_{number}@example.com',
+                first_name=f'Имя {number}',
+                last_name=f'Фамилия {number}',
+                password=password,
+            ) for number in range(count)
+        ), username__startswith=f'{PREFIX}_')
+
+    def create_tags(self, count):
+        return self.bulk_create(Tag, (
+            Tag(
+                name=f'{PREFIX} {number}',
+                color=f'#{self.rng.randrange(0x1000000):06X}',
+                slug=f'{PREFIX}-{number}',
+            ) for number in range(count)
+        ), slug__startswith=f'{PREFIX}-')
+
+    def create_ingredients(self, count):
+        return self.bulk_create(Ingredient, (
+            Ingredient(
+                name=f'{PREFIX} {self.rng.choice(WORDS)} {number}',
+                measurement_unit=self.rng.choice(UNITS),
+            ) for number in range(count)
+        ), name__startswith=f'{PREFIX} ')
+
+    def create_recipes(self, users, count):
+        return self.bulk_create(Recipe, (
+            Recipe(
+                author=self.rng.choice(users),
+                name=f'{self.rng.choice(WORDS).capitalize()} {number}',
+                text=' '.join(self.rng.choices(WORDS, k=30)),
+                cooking_time=self.rng.randint(1, 180),
+                image=f'recipes/{PREFIX}.png',
+            ) for number in range(count)
+        ), author__username__startswith=f'{PREFIX}_')
+
+    def fill_recipes(self, recipes, tags, ingredients, options):
+        """Добавляет рецептам теги и ингредиенты, возвращает их состав."""
+        amounts = {}
+        recipe_ingredients = []
+        recipe_tags = []
+        for recipe in recipes:
+            amounts[recipe.pk] = {
+                ingredient.pk: self.rng.randint(1, 500)
+                for ingredient in self.rng.sample(
+                    ingredients, min(options['ingredients'], len(ingredients))
+                )
+            }
+            recipe_ingredients.extend(
+                RecipeIngredient(
+                    recipe_id=recipe.pk, ingredient_id=pk, amount=amount
+                ) for pk, amount in amounts[recipe.pk].items()
+            )
+            recipe_tags.extend(
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+                for tag in self.rng.sample(
+                    tags, min(options['tags_per_recipe'], len(tags))
+                )
+            )
+        RecipeIngredient.objects.bulk_create(
+            recipe_ingredients, batch_size=5000
+        )
+        Recipe.tags.through.objects.bulk_create(recipe_tags, batch_size=5000)
+        return amounts
+
+    def create_relations(self, users, recipes, amounts, options):
+        subscriptions = []
+        favorites = []
+        carts = []
+        totals = []
+        for user in users:
+            authors = [author for author in self.rng.sample(
+                users, min(options['subscriptions'] + 1, len(users))
+            ) if author != user][:options['subscriptions']]
+            subscriptions.extend(
+                Subscribe(user=user, author=author) for author in authors
+            )
+            favorites.extend(
+                Favorite(user=user, recipe=recipe)
+                for recipe in self.rng.sample(
+                    recipes, min(options['favorites'], len(recipes))
+                )
+            )
+            cart = self.rng.sample(recipes, min(options['cart'], len(recipes)))
+            carts.extend(
+                ShoppingCart(user=user, recipe=recipe) for recipe in cart
+            )
+            total = Counter()
+            for recipe in cart:
+                total.update(amounts[recipe.pk])
+            totals.extend(
+                ShoppingCartTotal(
+                    user=user, ingredient_id=pk, total_amount=amount
+                ) for pk, amount in total.items()
+            )
+        for model, objects in (
+            (Subscribe, subscriptions),
+            (Favorite, favorites),
+            (ShoppingCart, carts),
+            (ShoppingCartTotal, totals),
+        ):
+            model.objects.bulk_create(objects, batch_size=5000)
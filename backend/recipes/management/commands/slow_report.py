@@ -0,0 +1,127 @@
+import glob
+import gzip
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов: маршруты и шаблоны SQL-запросов, '
+        'упорядоченные по суммарному времени.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help=(
+                'Файлы журнала; по умолчанию SLOW_REQUEST_LOG и его архивы, '
+                'в том числе сжатые gzip.'
+            )
+        )
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--route', help='Учитывать только запросы к этому маршруту.'
+        )
+        parser.add_argument(
+            '--json', action='store_true', help='Вывести сводку в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or sorted(
+            glob.glob(f'{glob.escape(settings.SLOW_REQUEST_LOG)}*')
+        )
+        if not paths:
+            raise CommandError(
+                f'Журнал {settings.SLOW_REQUEST_LOG} не найден.'
+            )
+        routes = defaultdict(list)
+        fingerprints = defaultdict(lambda: {
+            'count': 0, 'total_ms': 0.0, 'max_per_request': 0,
+            'requests': 0, 'routes': Counter(),
+        })
+        for entry in self.read(paths):
+            if options['route'] and entry['route'] != options['route']:
+                continue
+            routes[entry['route']].append(entry)
+            per_request = Counter()
+            for statement in entry['statements']:
+                item = fingerprints[statement['sql']]
+                item['count'] += 1
+                item['total_ms'] += statement['ms']
+                per_request[statement['sql']] += 1
+            for sql, count in per_request.items():
+                item = fingerprints[sql]
+                item['requests'] += 1
+                item['routes'][entry['route']] += 1
+                item['max_per_request'] = max(item['max_per_request'], count)
+        report = {
+            'routes': self.rank_routes(routes)[:options['top']],
+            'fingerprints': sorted((
+                {
+                    'sql': sql,
+                    'count': item['count'],
+                    'requests': item['requests'],
+                    'max_per_request': item['max_per_request'],
+                    'total_ms': round(item['total_ms'], 3),
+                    'mean_ms': round(item['total_ms'] / item['count'], 3),
+                    'routes': dict(item['routes'].most_common(3)),
+                } for sql, item in fingerprints.items()
+            ), key=lambda item: -item['total_ms'])[:options['top']],
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        self.write(report)
+
+    def read(self, paths):
+        for path in paths:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as file:
+                for number, line in enumerate(file, 1):
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        self.stderr.write(
+                            f'{path}:{number}: пропущена поврежденная строка'
+                        )
+
+    def rank_routes(self, routes):
+        ranked = []
+        for route, entries in routes.items():
+            durations = sorted(entry['duration_ms'] for entry in entries)
+            ranked.append({
+                'route': route,
+                'requests': len(entries),
+                'total_ms': round(sum(durations), 3),
+                'p50_ms': durations[len(durations) // 2],
+                'max_ms': durations[-1],
+                'db_share': round(
+                    sum(entry['db_ms'] for entry in entries)
+                    / (sum(durations) or 1), 3
+                ),
+                'max_queries': max(entry['queries'] for entry in entries),
+            })
+        return sorted(ranked, key=lambda item: -item['total_ms'])
+
+    def write(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING('Маршруты'))
+        for item in report['routes']:
+            self.stdout.write(
+                f'{item["route"]:<40} n={item["requests"]:<5} '
+                f'total={item["total_ms"]:10.1f} ms '
+                f'p50={item["p50_ms"]:8.1f} ms max={item["max_ms"]:8.1f} ms '
+                f'db={item["db_share"]:.0%} '
+                f'queries<={item["max_queries"]}'
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING('\nШаблоны SQL'))
+        for item in report['fingerprints']:
+            self.stdout.write(
+                f'total={item["total_ms"]:10.1f} ms n={item["count"]:<6} '
+                f'requests={item["requests"]:<5} '
+                f'per request<={item["max_per_request"]:<4} '
+                f'routes: {", ".join(item["routes"])}'
+            )
+            self.stdout.write(f'  {item["sql"]}')
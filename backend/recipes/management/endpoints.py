@@ -0,0 +1,85 @@
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.urls import router
+from recipes.models import Recipe, Tag
+
+
+def get_params(name):
+    """Типичные наборы параметров запроса для маршрута."""
+    slugs = list(Tag.objects.values_list('slug', flat=True)[:3])
+    author = Recipe.objects.values_list('author_id', flat=True).first()
+    return {
+        'recipes-list': (
+            {}, {'page': 2}, {'limit': 50}, {'tags': slugs},
+            {'tags': slugs, 'tags_match': 'all'}, {'author': author},
+            {'is_favorited': 1}, {'is_in_shopping_cart': 1},
+            {'search': 'суп'}, {'pagination': 'cursor'},
+            {'fields': 'id,name,image,cooking_time,tags,is_favorited,'
+                       'is_in_shopping_cart'},
+        ),
+        'ingredients-list': ({}, {'name': 'с'}),
+        'users-list': ({}, {'limit': 50}, {'omit': 'is_subscribed'}),
+        'users-subscriptions': (
+            {}, {'recipes_limit': 3}, {'omit': 'recipes,recipes_count'},
+        ),
+    }.get(name, ({},))
+
+
+def get_requests():
+    """Перебирает GET-маршруты роутера api: (маршрут, метка, url)."""
+    for prefix, viewset, basename in router.registry:
+        lookup = viewset.lookup_url_kwarg or viewset.lookup_field
+        pk = viewset.queryset.model._default_manager.order_by(
+            '-pk'
+        ).values_list('pk', flat=True).first()
+        for route in router.get_routes(viewset):
+            if 'get' not in route.mapping:
+                continue
+            if not hasattr(viewset, route.mapping['get']):
+                continue
+            if route.detail and pk is None:
+                continue
+            name = route.name.format(basename=basename)
+            url = reverse(
+                f'api:{name}',
+                kwargs={lookup: pk} if route.detail else None
+            )
+            for params in get_params(name):
+                query = urlencode(params, doseq=True)
+                yield (
+                    name,
+                    f'{name} ?{query}' if query else name,
+                    f'{url}?{query}' if query else url,
+                )
+
+
+def api_settings(**overrides):
+    """Настройки, при которых тестовый клиент принимается приложением."""
+    return override_settings(
+        ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS], **overrides
+    )
+
+
+def call(url, user=None, method='get', data=None):
+    """Выполняет запрос в процессе: ответ, SQL-запросы и время."""
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        if method == 'get':
+            response = client.get(url, data)
+        else:
+            response = getattr(client, method)(url, data, format='json')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - start
+    return response, queries.captured_queries, elapsed
@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 16:41
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+    keepers = {}
+    for pk, name, measurement_unit in Ingredient.objects.order_by(
+        'pk'
+    ).values_list('pk', 'name', 'measurement_unit'):
+        keeper = keepers.setdefault((name, measurement_unit), pk)
+        if keeper == pk:
+            continue
+        for model, owner, amount in (
+            (RecipeIngredient, 'recipe_id', 'amount'),
+            (ShoppingCartTotal, 'user_id', 'total_amount'),
+        ):
+            for row in model.objects.filter(ingredient_id=pk):
+                merged = model.objects.filter(
+                    ingredient_id=keeper, **{owner: getattr(row, owner)}
+                ).update(**{amount: F(amount) + getattr(row, amount)})
+                if merged:
+                    row.delete()
+                else:
+                    row.ingredient_id = keeper
+                    row.save(update_fields=('ingredient',))
+        Ingredient.objects.filter(pk=pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_shoppingcarttotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_measurement_unit'),
+        ),
+    ]
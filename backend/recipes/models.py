@@ -1,10 +1,20 @@
+from collections import Counter, defaultdict
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField)
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (BooleanField, Case, Exists, F, FloatField,
+                              OuterRef, Prefetch, Q, Sum, Value, When, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.urls import reverse
 
 import api.constants as const
+from recipes.storage import ContentHashStorage
+from users.models import Subscribe
 
 User = get_user_model()
 
@@ -58,6 +68,19 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient_measurement_unit',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('name',),
+                opclasses=('varchar_pattern_ops',),
+                name='ingredient_name_prefix_idx',
+            ),
+        )
 
     def __str__(self):
         return const.INGREDIENT_TEMPLATE.format(
@@ -66,6 +89,103 @@ class Ingredient(models.Model):
         )
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def search(self, query):
+        """Полнотекстовый поиск по названию и описанию с ранжированием."""
+        if connections[self.db].vendor == 'postgresql':
+            search_query = SearchQuery(
+                query, config=const.SEARCH_CONFIG, search_type='websearch'
+            )
+            return self.filter(search_vector=search_query).annotate(
+                rank=SearchRank(F('search_vector'), search_query)
+            ).order_by('-rank', *self.model._meta.ordering)
+        queryset = self
+        for term in query.split():
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(text__icontains=term)
+            )
+        return queryset.annotate(rank=Case(
+            When(name__icontains=query, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )).order_by('-rank', *self.model._meta.ordering)
+
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами избранного и списка покупок."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def with_related(self, user, fields=None):
+        """Подгружает теги, автора и ингредиенты рецептов.
+
+        Если переданы поля представления, связи не из их числа
+        не подгружаются.
+        """
+        lookups = {
+            'tags': Prefetch('tags', queryset=Tag.objects.order_by('pk')),
+            'author': Prefetch(
+                'author',
+                queryset=User.objects.with_is_subscribed(user),
+            ),
+            'ingredients': Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('pk'),
+            ),
+        }
+        return self.prefetch_related(*(
+            lookup for name, lookup in lookups.items()
+            if fields is None or name in fields
+        ))
+
+    def limited_by_author(self, authors, limit):
+        """Последние limit рецептов каждого автора одним запросом."""
+        ranked = self.filter(author__in=authors).annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('pk').desc(),
+            )
+        ).values('pk', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            'WHERE ranked.row_number <= %s',
+            (*params, limit),
+        ))
+
+    def fingerprint(self, user):
+        """Строки выборки со всем, от чего зависит представление рецепта.
+
+        Связи рецепта меняют поле updated, флаги пользователя
+        возвращаются для каждой строки, поэтому разные наборы избранного
+        не совпадают, как могли бы совпасть их суммы.
+        """
+        fields = ('pk', 'updated', 'author_id')
+        queryset = self
+        if user.is_authenticated:
+            queryset = self.with_user_flags(user).annotate(
+                is_subscribed=Exists(Subscribe.objects.filter(
+                    user=user, author=OuterRef('author')
+                ))
+            )
+            fields += ('is_favorited', 'is_in_shopping_cart', 'is_subscribed')
+        return list(queryset.order_by('pk').values_list(*fields))
+
+
 class Recipe(models.Model):
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -87,6 +207,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Фото рецепта',
         upload_to='recipes/',
+        storage=ContentHashStorage(),
         blank=False,
         null=False,
     )
@@ -108,11 +229,26 @@ class Recipe(models.Model):
             ),
         )
     )
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pk',)
+        indexes = (
+            models.Index(
+                fields=('author', '-id'),
+                name='recipe_author_id_idx',
+            ),
+        )
 
     def __str__(self):
         return const.RECIPE_TEMPLATE.format(self.name)
@@ -157,6 +293,12 @@ class RecipeIngredient(models.Model):
                 name='unique_ingredient',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipe', 'ingredient', 'amount'),
+                name='recipe_ingredient_recipe_idx',
+            ),
+        )
 
     def __str__(self):
         return const.INGREDIENT_IN_RECIPE_TEMPLATE.format(
@@ -215,3 +357,127 @@ class ShoppingCart(UserRecipes):
 
     def __str__(self):
         return const.SHOPING_CART_TEMPLATE.format(self.user)
+
+
+class ShoppingCartTotalQuerySet(models.QuerySet):
+
+    def apply(self, user_ids, amounts):
+        """Прибавляет к итогам пользователей количества {id: delta}.
+
+        Строки пользователей блокируются, поэтому конкурентные изменения
+        итогов одного пользователя выполняются по очереди и не вставляют
+        одну и ту же строку дважды.
+        """
+        amounts = {pk: delta for pk, delta in amounts.items() if delta}
+        if not user_ids or not amounts:
+            return
+        with transaction.atomic():
+            User.objects.lock(user_ids)
+            existing = {
+                (total.user_id, total.ingredient_id): total
+                for total in self.select_for_update().filter(
+                    user_id__in=user_ids,
+                    ingredient_id__in=amounts,
+                )
+            }
+            changed, created, emptied = [], [], []
+            for user_id in user_ids:
+                for ingredient_id, delta in amounts.items():
+                    total = existing.get((user_id, ingredient_id))
+                    if total is None:
+                        if delta > 0:
+                            created.append(self.model(
+                                user_id=user_id,
+                                ingredient_id=ingredient_id,
+                                total_amount=delta,
+                            ))
+                        continue
+                    total.total_amount += delta
+                    if total.total_amount > 0:
+                        changed.append(total)
+                    else:
+                        emptied.append(total.pk)
+            self.bulk_update(changed, ('total_amount',))
+            self.bulk_create(created)
+            self.filter(pk__in=emptied).delete()
+
+    def add_recipes(self, user_ids, recipes):
+        self.apply(user_ids, recipe_amounts(recipes))
+
+    def remove_recipes(self, user_ids, recipes):
+        self.apply(user_ids, {
+            pk: -amount for pk, amount in recipe_amounts(recipes).items()
+        })
+
+    def remove_carts(self, carts):
+        """Вычитает из итогов рецепты удаляемых записей списка покупок."""
+        recipes = defaultdict(list)
+        for user_id, recipe_id in carts.values_list('user_id', 'recipe_id'):
+            recipes[user_id].append(recipe_id)
+        for user_id, recipe_ids in recipes.items():
+            self.remove_recipes((user_id,), recipe_ids)
+
+    def apply_recipe_ingredients(self, recipe_ingredients, sign=1):
+        """Учитывает строки ингредиентов рецептов в итогах их списков.
+
+        sign=1 прибавляет количества добавленных строк, sign=-1 вычитает
+        количества удаляемых.
+        """
+        amounts = defaultdict(Counter)
+        for recipe_id, ingredient_id, amount in recipe_ingredients.values_list(
+            'recipe_id', 'ingredient_id', 'amount'
+        ):
+            amounts[recipe_id][ingredient_id] += sign * amount
+        for recipe_id, deltas in amounts.items():
+            self.apply(
+                list(
+                    ShoppingCart.objects.filter(recipe_id=recipe_id)
+                    .values_list('user_id', flat=True)
+                ),
+                deltas
+            )
+
+
+def recipe_amounts(recipes):
+    """Суммарное количество каждого ингредиента в рецептах."""
+    return dict(
+        RecipeIngredient.objects.filter(recipe__in=recipes)
+        .values('ingredient_id')
+        .annotate(total_amount=Sum('amount'))
+        .values_list('ingredient_id', 'total_amount')
+    )
+
+
+class ShoppingCartTotal(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_cart_totals',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        related_name='shopping_cart_totals',
+        on_delete=models.CASCADE,
+    )
+    total_amount = models.PositiveIntegerField('Общее количество')
+
+    objects = ShoppingCartTotalQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_total',
+            ),
+        )
+
+    def __str__(self):
+        return const.SHOPING_CART.format(
+            self.ingredient.name,
+            self.total_amount,
+            self.ingredient.measurement_unit,
+        )
@@ -0,0 +1,14 @@
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentHashStorage(FileSystemStorage):
+    """Хранилище файлов, названных по хешу содержимого.
+
+    Если файл с таким именем уже есть, он не перезаписывается и не
+    копируется: одинаковые изображения занимают на диске одно место.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is not None and self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -1,10 +1,54 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import BooleanField, Count, Exists, OuterRef, Value
 
 import api.constants as const
 from api.validators import username_validator
 
 
+class UserQuerySet(models.QuerySet):
+
+    def with_is_subscribed(self, user):
+        """Аннотирует пользователей флагом подписки на них."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return self.annotate(
+            is_subscribed=Exists(Subscribe.objects.filter(
+                user=user, author=OuterRef('pk')
+            ))
+        )
+
+    def lock(self, user_ids):
+        """Блокирует строки пользователей до конца транзакции.
+
+        Строки блокируются в порядке pk, чтобы конкурентные транзакции,
+        блокирующие пересекающиеся наборы пользователей, не
+        взаимоблокировались.
+        """
+        return list(
+            self.select_for_update().filter(pk__in=user_ids)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def subscriptions_of(self, user, fields=None):
+        """Авторы, на которых подписан пользователь.
+
+        Число рецептов не считается, если его нет среди переданных полей.
+        """
+        queryset = self.filter(subscribing__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by(*self.model._meta.ordering)
+        if fields is None or 'recipes_count' in fields:
+            queryset = queryset.annotate(recipes_count=Count('recipes'))
+        return queryset
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     class UserRole(models.TextChoices):
         ADMIN = 'Admin'
@@ -38,6 +82,8 @@ class User(AbstractUser):
         default=False
     )
 
+    objects = CustomUserManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
 
@@ -84,6 +130,12 @@ class Subscribe(models.Model):
                 name='check_self_subscribing',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='subscribe_author_user_idx',
+            ),
+        )
 
     def __str__(self):
         return const.SUBSCRIBE_TEMPLATE.format(self.user, self.author)